@@ -0,0 +1,123 @@
+from array import array
+from itertools import repeat
+import operator
+
+from Lexer.token_types import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# element type -> typecode of the array module, 64 bit both
+TYPECODES = {
+    INTEGER: 'q',
+    REAL: 'd',
+}
+
+# operator -> (NumPy ufunc name, scalar function)
+OPERATIONS = {
+    PLUS: ('add', operator.add),
+    MINUS: ('subtract', operator.sub),
+    MUL: ('multiply', operator.mul),
+    INTEGER_DIV: ('floor_divide', operator.floordiv),
+    FLOAT_DIV: ('true_divide', operator.truediv),
+}
+
+# below this magnitude a floating point estimate of an integer result
+# proves that it fits in 64 bits
+SAFE_MAGNITUDE = 2.0 ** 62
+
+
+def new_array(element_type, size):
+    """Return a zeroed array of `size` elements of `element_type`."""
+    return array(TYPECODES[element_type], bytes(8 * size))
+
+
+def view(values):
+    """Return a NumPy array sharing the memory of the array `values`."""
+    return numpy.frombuffer(values, dtype=values.typecode)
+
+
+def fill(dest, value):
+    """Set every element of the array `dest` to `value`."""
+    if numpy is not None:
+        view(dest).fill(value)
+    else:
+        dest[:] = array(dest.typecode, (value,)) * len(dest)
+
+
+def assign(dest, value):
+    """Copy the array `value` into the array `dest` of the same length,
+    or fill `dest` with the scalar `value`."""
+    if not isinstance(value, array):
+        fill(dest, value)
+    elif value.typecode == dest.typecode:
+        dest[:] = value
+    elif numpy is not None:
+        view(dest)[:] = view(value)
+    else:
+        dest[:] = array(dest.typecode, value)
+
+
+def elementwise(op, left, right):
+    """Apply the operator `op` to the elements of the arrays `left` and
+    `right`, or of an array and a scalar, and return the new array.
+
+    The elements are REAL if either operand's are or `op` is '/', else
+    INTEGER. Division by zero raises ZeroDivisionError like it does on
+    scalars; unlike scalars, INTEGER elements are 64 bit, and a result
+    out of their range raises OverflowError, with or without NumPy.
+    """
+    left_array = isinstance(left, array)
+    right_array = isinstance(right, array)
+    size = len(left) if left_array else len(right)
+    if op == FLOAT_DIV or 'd' in (getattr(left, 'typecode', None),
+                                  getattr(right, 'typecode', None)) \
+            or isinstance(left, float) or isinstance(right, float):
+        typecode = 'd'
+    else:
+        typecode = 'q'
+    ufunc_name, function = OPERATIONS[op]
+
+    if op in (INTEGER_DIV, FLOAT_DIV):
+        if (0 in right) if right_array else right == 0:
+            raise ZeroDivisionError('division by zero')
+
+    if numpy is not None:
+        result = array(typecode, bytes(8 * size))
+        ufunc = getattr(numpy, ufunc_name)
+        if left_array:
+            left = view(left)
+        if right_array:
+            right = view(right)
+        with numpy.errstate(over='ignore'):
+            ufunc(left, right, out=view(result))
+        if typecode == 'q':
+            check_overflow(ufunc, function, left, right)
+        return result
+
+    if not left_array:
+        left = repeat(left)
+    if not right_array:
+        right = repeat(right)
+    return array(typecode, map(function, left, right))
+
+
+def check_overflow(ufunc, function, left, right):
+    """Raise OverflowError, as array('q') does, if an INTEGER result of
+    `ufunc` does not fit in 64 bits: NumPy wraps those around silently.
+
+    The results are estimated in floating point; only the elements whose
+    estimate is near the limits are computed exactly, by `function`.
+    """
+    estimate = ufunc(numpy.asarray(left, dtype='d'),
+                     numpy.asarray(right, dtype='d'))
+    near = numpy.flatnonzero(numpy.abs(estimate) >= SAFE_MAGNITUDE)
+    if not len(near):
+        return
+    left = numpy.broadcast_to(left, estimate.shape)
+    right = numpy.broadcast_to(right, estimate.shape)
+    for i in near:
+        # raises OverflowError when out of range
+        array('q', (function(int(left[i]), int(right[i])),))
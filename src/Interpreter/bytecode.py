@@ -0,0 +1,454 @@
+import marshal
+from array import array
+from Lexer.token_types import *
+from Parser.ast import ArrayType, Call, Condition, NoOp, Num, String, Var
+from Parser.visitor import NodeVisitor
+
+###############################################################################
+#                                                                             #
+#  Instruction set                                                            #
+#                                                                             #
+###############################################################################
+
+# Values live in frame slots: LOCAL addresses the running routine's own
+# frame, NONLOCAL takes a (level, slot) pair resolved through the display.
+LOAD_CONST = 0          # constant index
+LOAD_LOCAL = 1          # slot
+STORE_LOCAL = 2         # slot
+LOAD_NONLOCAL = 3       # level, slot
+STORE_NONLOCAL = 4      # level, slot
+BINARY_ADD = 5
+BINARY_SUB = 6
+BINARY_MUL = 7
+BINARY_INT_DIV = 8
+BINARY_FLOAT_DIV = 9
+UNARY_NEG = 10
+UNARY_POS = 11
+COMPARE_LESS = 12
+COMPARE_GREATER = 13
+COMPARE_EQUAL = 14
+COMPARE_LESS_EQUAL = 15
+JUMP = 16               # target
+JUMP_IF_FALSE = 17      # target
+CALL = 18               # routine number, argument count
+RETURN = 19
+POP = 20
+PRINT = 21
+READ = 22               # converter
+HALT = 23
+# superinstructions: FOR_PREP jumps to target unless slot <= last slot,
+# FOR_NEXT adds 1 to slot and jumps back to target while slot <= last
+# slot; JUMP_IF_NOT_<compare> pops two values and jumps unless they
+# compare; BINARY_LOCAL2 and BINARY_LOCAL_CONST push the result of the
+# binary operator or comparison opcode applied to two local slots, or
+# to a local slot and a constant
+FOR_PREP = 24           # slot, last slot, target
+FOR_NEXT = 25           # slot, last slot, target
+JUMP_IF_NOT_LESS = 26   # target
+JUMP_IF_NOT_GREATER = 27    # target
+JUMP_IF_NOT_EQUAL = 28  # target
+BINARY_LOCAL2 = 29      # opcode, slot, slot
+BINARY_LOCAL_CONST = 30     # opcode, slot, constant index
+
+OPNAMES = (
+    'LOAD_CONST', 'LOAD_LOCAL', 'STORE_LOCAL', 'LOAD_NONLOCAL',
+    'STORE_NONLOCAL', 'BINARY_ADD', 'BINARY_SUB', 'BINARY_MUL',
+    'BINARY_INT_DIV', 'BINARY_FLOAT_DIV', 'UNARY_NEG', 'UNARY_POS',
+    'COMPARE_LESS', 'COMPARE_GREATER', 'COMPARE_EQUAL', 'COMPARE_LESS_EQUAL',
+    'JUMP', 'JUMP_IF_FALSE', 'CALL', 'RETURN', 'POP', 'PRINT', 'READ', 'HALT',
+    'FOR_PREP', 'FOR_NEXT', 'JUMP_IF_NOT_LESS', 'JUMP_IF_NOT_GREATER',
+    'JUMP_IF_NOT_EQUAL', 'BINARY_LOCAL2',
+    'BINARY_LOCAL_CONST',
+)
+# number of inline operands of each opcode
+OPERANDS = (
+    1, 1, 1, 2,
+    2, 0, 0, 0,
+    0, 0, 0, 0,
+    0, 0, 0, 0,
+    1, 1, 2, 0, 0, 0, 1, 0,
+    3, 3, 1, 1,
+    1, 3, 3,
+)
+
+# READ operands: how the input line is converted
+READ_CONVERTERS = (str, int, float)
+
+BINARY_OPCODES = {
+    PLUS: BINARY_ADD,
+    MINUS: BINARY_SUB,
+    MUL: BINARY_MUL,
+    INTEGER_DIV: BINARY_INT_DIV,
+    FLOAT_DIV: BINARY_FLOAT_DIV,
+    LESS_THAN: COMPARE_LESS,
+    GREATER_THAN: COMPARE_GREATER,
+    EQUAL: COMPARE_EQUAL,
+}
+
+# comparison of an IF or WHILE condition -> the jump taken when false
+COMPARE_JUMPS = {
+    LESS_THAN: JUMP_IF_NOT_LESS,
+    GREATER_THAN: JUMP_IF_NOT_GREATER,
+    EQUAL: JUMP_IF_NOT_EQUAL,
+}
+
+FORMAT_VERSION = 2
+
+
+class Routine(object):
+    """A compiled procedure or function (or the main program)."""
+    __slots__ = ('name', 'entry', 'level', 'frame_size', 'params')
+
+    def __init__(self, name, entry, level, frame_size, params):
+        self.name = name
+        self.entry = entry
+        self.level = level
+        # slots per frame: the scope's slots plus compiler temporaries
+        self.frame_size = frame_size
+        # slots the actual parameters are stored in, in order
+        self.params = params
+
+
+class BytecodeProgram(object):
+    """A flat instruction stream with its constant pool and routines.
+
+    `code` holds opcodes and their inline operands in one `array('i')`.
+    Routine 0 is the main program.
+    """
+
+    def __init__(self, code, constants, routines):
+        self.code = code
+        self.constants = constants
+        self.routines = routines
+
+    def dumps(self):
+        """Serialize the program to bytes."""
+        return marshal.dumps((
+            FORMAT_VERSION,
+            self.code.tobytes(),
+            tuple(self.constants),
+            tuple(
+                (r.name, r.entry, r.level, r.frame_size, tuple(r.params))
+                for r in self.routines
+            ),
+        ))
+
+    @classmethod
+    def loads(cls, data):
+        version, code_bytes, constants, routines = marshal.loads(data)
+        if version != FORMAT_VERSION:
+            raise Exception(f'Unsupported bytecode version {version}')
+        code = array('i')
+        code.frombytes(code_bytes)
+        return cls(code, list(constants),
+                   [Routine(*routine) for routine in routines])
+
+
+def disassemble(program):
+    """Return a listing of `program`, one instruction per line."""
+    entries = {r.entry: r for r in program.routines}
+    code = program.code
+    lines = []
+    pc = 0
+    while pc < len(code):
+        routine = entries.get(pc)
+        if routine is not None:
+            lines.append(
+                f'{routine.name} (level {routine.level}, '
+                f'{routine.frame_size} slots, params {list(routine.params)}):'
+            )
+        op = code[pc]
+        operands = list(code[pc + 1:pc + 1 + OPERANDS[op]])
+        text = f'  {pc:5d} {OPNAMES[op]:<19}' + ' '.join(map(str, operands))
+        if op == LOAD_CONST:
+            text += f'  ({program.constants[operands[0]]!r})'
+        elif op == CALL:
+            text += f'  ({program.routines[operands[0]].name})'
+        elif op == READ:
+            text += f'  ({READ_CONVERTERS[operands[0]].__name__})'
+        elif op == BINARY_LOCAL2:
+            text += f'  ({OPNAMES[operands[0]]})'
+        elif op == BINARY_LOCAL_CONST:
+            text += (f'  ({OPNAMES[operands[0]]}, '
+                     f'{program.constants[operands[2]]!r})')
+        lines.append(text.rstrip())
+        pc += 1 + OPERANDS[op]
+    return '\n'.join(lines)
+
+
+###############################################################################
+#                                                                             #
+#  Compiler                                                                   #
+#                                                                             #
+###############################################################################
+
+class BytecodeCompiler(NodeVisitor):
+    """Lowers an analyzed program to a `BytecodeProgram`.
+
+    Routines are laid out one after the other: a declaration only
+    reserves a routine number, its body is compiled once the enclosing
+    routine is finished.
+    """
+
+    def __init__(self, scopes):
+        self.scopes = scopes
+        self.code = array('i')
+        self.constants = []
+        self.constant_index = {}
+        self.routines = []
+        # ProcedureSymbol -> routine number
+        self.routine_index = {}
+        # (routine number, scope, declaration) waiting to be compiled
+        self.pending = []
+        self.scope = None
+        self.frame_size = 0
+
+    def compile(self, tree):
+        """Return the `BytecodeProgram` of the program `tree`."""
+        self.visit(tree)
+        return BytecodeProgram(self.code, self.constants, self.routines)
+
+    def emit(self, op, *operands):
+        self.code.append(op)
+        self.code.extend(operands)
+
+    def label(self):
+        return len(self.code)
+
+    def emit_jump(self, op):
+        """Emit a jump with a placeholder target, return its position."""
+        self.emit(op, -1)
+        return len(self.code) - 1
+
+    def fused(self, left, right):
+        """Return the superinstruction and operands loading `left` and
+        `right`, a local variable and a local variable or literal, else
+        None."""
+        level = self.scope.scope_level
+        if type(left) is not Var or left.level != level:
+            return None
+        if type(right) is Var and right.level == level:
+            return BINARY_LOCAL2, left.slot, right.slot
+        if type(right) in (Num, String):
+            return BINARY_LOCAL_CONST, left.slot, self.constant(right.value)
+        return None
+
+    def binary(self, opcode, left, right):
+        """Emit the binary operator or comparison `opcode` applied to
+        `left` and `right`."""
+        fused = self.fused(left, right)
+        if fused is not None:
+            superinstruction, first, second = fused
+            self.emit(superinstruction, opcode, first, second)
+            return
+        self.expr(left)
+        self.expr(right)
+        self.emit(opcode)
+
+    def emit_test(self, condition):
+        """Emit the test of `condition` and a jump taken when it is
+        false, return the position of the jump target."""
+        if isinstance(condition, Condition) and \
+                condition.op_type in COMPARE_JUMPS and \
+                self.fused(condition.left, condition.right) is None:
+            self.expr(condition.left)
+            self.expr(condition.right)
+            return self.emit_jump(COMPARE_JUMPS[condition.op_type])
+        self.expr(condition)
+        return self.emit_jump(JUMP_IF_FALSE)
+
+    def patch(self, position, target=None):
+        self.code[position] = self.label() if target is None else target
+
+    def constant(self, value):
+        # keyed by type too, so that 1, 1.0 and True stay apart
+        key = (type(value), value)
+        index = self.constant_index.get(key)
+        if index is None:
+            index = self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def temporary(self):
+        """Reserve a slot of the current frame for the compiler."""
+        slot = self.frame_size
+        self.frame_size += 1
+        return slot
+
+    def load(self, var):
+        if var.level == self.scope.scope_level:
+            self.emit(LOAD_LOCAL, var.slot)
+        else:
+            self.emit(LOAD_NONLOCAL, var.level, var.slot)
+
+    def store(self, var):
+        if var.level == self.scope.scope_level:
+            self.emit(STORE_LOCAL, var.slot)
+        else:
+            self.emit(STORE_NONLOCAL, var.level, var.slot)
+
+    ###########################################################################
+    # routines
+
+    def visit_Program(self, node):
+        self.routines.append(None)
+        self.routine(0, node.name, self.scopes['_global'], (), node.block)
+        while self.pending:
+            self.routine(*self.pending.pop(0))
+
+    def routine(self, number, name, scope, params, block):
+        self.scope = scope
+        self.frame_size = scope.slot_count
+        entry = self.label()
+        self.visit(block)
+        self.emit(HALT if number == 0 else RETURN)
+        self.routines[number] = Routine(
+            name, entry, scope.scope_level, self.frame_size, params)
+
+    def visit_Block(self, node):
+        for declaration in node.declarations:
+            self.visit(declaration)
+        self.visit(node.compound_statement)
+
+    def visit_VarDecl(self, node):
+        if isinstance(node.type_node, ArrayType):
+            raise Exception('Error: ARRAY is not supported by the vm engine')
+
+    def visit_ProcedureDecl(self, node):
+        proc_symbol = self.scope.lookup(node.proc_name, True)
+        number = len(self.routines)
+        self.routines.append(None)
+        self.routine_index[proc_symbol] = number
+        params = tuple(param.slot for param in proc_symbol.params)
+        self.pending.append((number, node.proc_name,
+                             self.scopes[node.proc_name], params,
+                             node.block_node))
+
+    def visit_FunctionDecl(self, node):
+        self.visit_ProcedureDecl(node)
+
+    ###########################################################################
+    # statements
+
+    def visit_NoOp(self, node):
+        pass
+
+    def visit_Compound(self, node):
+        for child in node.children:
+            self.visit(child)
+
+    def visit_Assign(self, node):
+        self.expr(node.right)
+        self.store(node.left)
+
+    def visit_IfElse(self, node):
+        to_else = self.emit_test(node.result)
+        self.visit(node.true_statement)
+        if isinstance(node.false_statement, NoOp):
+            self.patch(to_else)
+            return
+        to_end = self.emit_jump(JUMP)
+        self.patch(to_else)
+        self.visit(node.false_statement)
+        self.patch(to_end)
+
+    def visit_While(self, node):
+        start = self.label()
+        to_end = self.emit_test(node.result)
+        self.visit(node.statement)
+        self.emit(JUMP, start)
+        self.patch(to_end)
+
+    def visit_For(self, node):
+        loop_var = node.beg.left
+        self.visit(node.beg)
+        last = self.temporary()
+        self.expr(node.end)
+        self.emit(STORE_LOCAL, last)
+        if loop_var.level == self.scope.scope_level:
+            # a local counter is tested and stepped by one instruction
+            self.emit(FOR_PREP, loop_var.slot, last, -1)
+            to_end = self.label() - 1
+            start = self.label()
+            self.visit(node.statement)
+            self.emit(FOR_NEXT, loop_var.slot, last, start)
+            self.patch(to_end)
+            return
+        start = self.label()
+        self.load(loop_var)
+        self.emit(LOAD_LOCAL, last)
+        self.emit(COMPARE_LESS_EQUAL)
+        to_end = self.emit_jump(JUMP_IF_FALSE)
+        self.visit(node.statement)
+        self.load(loop_var)
+        self.emit(LOAD_CONST, self.constant(1))
+        self.emit(BINARY_ADD)
+        self.store(loop_var)
+        self.emit(JUMP, start)
+        self.patch(to_end)
+
+    def visit_Call(self, node):
+        if self.is_builtin(node):
+            self.builtin(node)
+            return
+        # a call statement discards the value of the call
+        self.call(node)
+        self.emit(POP)
+
+    ###########################################################################
+    # expressions
+
+    def expr(self, node):
+        if isinstance(node, Call):
+            self.call(node)
+        else:
+            self.visit(node)
+
+    def visit_Num(self, node):
+        self.emit(LOAD_CONST, self.constant(node.value))
+
+    visit_String = visit_Num
+
+    def visit_Var(self, node):
+        self.load(node)
+
+    def visit_UnaryOp(self, node):
+        self.expr(node.expr)
+        self.emit(UNARY_NEG if node.op.type == MINUS else UNARY_POS)
+
+    def visit_BinOp(self, node):
+        self.binary(BINARY_OPCODES[node.op.type], node.left, node.right)
+
+    def visit_Condition(self, node):
+        self.binary(BINARY_OPCODES[node.op_type], node.left, node.right)
+
+    def is_builtin(self, node):
+        return self.scope.lookup(node.procedure) not in self.routine_index
+
+    def call(self, node):
+        if self.is_builtin(node):
+            self.builtin(node)
+            # builtins have no value
+            self.emit(LOAD_CONST, self.constant(None))
+            return
+        proc_symbol = self.scope.lookup(node.procedure)
+        number = self.routine_index[proc_symbol]
+        actuals = [a for _, a in zip(proc_symbol.params, node.params)]
+        for actual in actuals:
+            self.expr(actual)
+        self.emit(CALL, number, len(actuals))
+
+    def builtin(self, node):
+        if node.procedure == 'WRITELN':
+            for param in node.params:
+                self.expr(param)
+                self.emit(PRINT)
+        elif node.procedure == 'READLN':
+            for param in node.params:
+                var_type = self.scope.lookup(param.value).type
+                converter = {INTEGER: 1, REAL: 2}.get(
+                    var_type.name if var_type else None, 0)
+                self.emit(READ, converter)
+                self.store(param)
+        else:
+            raise Exception(f'Error: Unknown builtin \'{node.procedure}\'')
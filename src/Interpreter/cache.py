@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import time
+
+# Bump whenever the AST, token or symbol classes change shape, so that
+# entries written by an older interpreter are never loaded.
+CACHE_VERSION = 10
+
+
+class ProgramCache(object):
+    """On-disk cache of analyzed programs (the .pyc of a .pas file).
+
+    An entry holds the pickled AST together with the scopes returned by
+    `SemanticAnalyzer.analyze()`. Entries are keyed by a hash of the
+    source text, the cache version and the Python version. Entries that
+    are older than `max_age` seconds, or the least recently used ones
+    once the directory grows past `max_bytes`, are evicted on store.
+    """
+    SUFFIX = '.pasc'
+
+    def __init__(self, directory, max_bytes=64 << 20, max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.version = '{}:{}.{}'.format(
+            CACHE_VERSION, sys.version_info.major, sys.version_info.minor)
+
+    def key(self, text):
+        """Return the cache key of the source `text`."""
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    def file_key(self, path, chunk_size=1 << 20):
+        """Return the cache key of the source file at `path`."""
+        digest = hashlib.sha256(self.version.encode())
+        with open(path, 'r') as source:
+            chunk = source.read(chunk_size)
+            while chunk:
+                digest.update(chunk.encode())
+                chunk = source.read(chunk_size)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key):
+        """Return the cached (tree, scopes) for `key`, or None."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as entry:
+                version, tree, scopes = pickle.load(entry)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # a truncated or foreign file is dropped rather than trusted
+            logging.debug(f' Invalid cache entry {path}: {e}')
+            self.remove(path)
+            return None
+        if version != self.version:
+            self.remove(path)
+            return None
+        # the modification time doubles as the last-used time
+        os.utime(path)
+        logging.debug(f' Loaded {path} from cache')
+        return tree, scopes
+
+    def store(self, key, tree, scopes):
+        """Write an entry for `key`, then evict old entries."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as entry:
+                pickle.dump((self.version, tree, scopes), entry,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except (RecursionError, OSError) as e:
+            # too deep to pickle, or the directory is not writable
+            logging.debug(f' Cannot cache {path}: {e}')
+            self.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones until
+        the cache fits in `max_bytes`."""
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self.remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,560 @@
+from Lexer.token_types import *
+from Parser.ast import ArrayType, Index, Num, String, Var, NoOp
+from Parser.visitor import NodeVisitor
+from .arrays import assign as assign_values, elementwise, new_array
+from .frame import Frame
+from .input import Input
+from .output import Output
+
+
+class ClosureCompiler(NodeVisitor):
+    """Execution engine that turns the analyzed AST into Python closures.
+
+    Every node is visited once, at compile time, and becomes a closure
+    taking the current `Frame`: statements return nothing, expressions
+    return their value. Operators, operand kinds (local variable,
+    constant, anything else) and call targets are all decided while
+    compiling, so running the program is just a call of the root
+    closure. The output is identical to `Interpreter.interpret()`.
+    """
+
+    def __init__(self, scopes, output=None, input=None):
+        self.scopes = scopes
+        self.output = output if output is not None else Output()
+        self.input = input if input is not None else Input()
+        self.scope = None
+        # ProcedureSymbol -> [body closure], filled in when the declaration
+        # is compiled; the list lets recursive calls refer to the body
+        # before it exists
+        self.bodies = {}
+        # ProcedureSymbol -> Block of the routines `routine` compiles on
+        # demand, see `declare`
+        self.blocks = {}
+
+    def compile(self, tree):
+        """Return a function running the program `tree`."""
+        return self.visit(tree)
+
+    def declare(self, tree):
+        """Record the routines declared anywhere in the program `tree`,
+        so that parts of it can be compiled on their own: a call of a
+        routine that is not compiled yet compiles it."""
+        stack = [tree.block]
+        while stack:
+            block = stack.pop()
+            for declaration in block.declarations:
+                block_node = getattr(declaration, 'block_node', None)
+                if block_node is None:
+                    continue
+                name = declaration.proc_name
+                proc_symbol = self.scopes[name].enclosing_scope.lookup(
+                    name, True)
+                self.blocks[proc_symbol] = block_node
+                stack.append(block_node)
+
+    def routine(self, proc_symbol):
+        """Return the [body closure] of the declared routine
+        `proc_symbol`, compiling it the first time."""
+        cell = self.bodies.get(proc_symbol)
+        if cell is None:
+            cell = self.bodies[proc_symbol] = [None]
+            enclosing_scope = self.scope
+            self.scope = self.scopes[proc_symbol.name]
+            cell[0] = self.visit(self.blocks[proc_symbol])
+            self.scope = enclosing_scope
+        return cell
+
+    def compile_in(self, node, scope):
+        """Return the closure of the statement or expression `node` of
+        a routine of `scope`."""
+        enclosing_scope = self.scope
+        self.scope = scope
+        try:
+            return self.visit(node)
+        finally:
+            self.scope = enclosing_scope
+
+    def visit_Program(self, node):
+        scope = self.scopes['_global']
+        self.scope = scope
+        block = self.visit(node.block)
+        self.scope = None
+
+        output = self.output
+
+        def program():
+            try:
+                block(Frame(scope))
+            finally:
+                output.flush()
+        return program
+
+    def visit_Block(self, node):
+        arrays = []
+        for declaration in node.declarations:
+            array_decl = self.visit(declaration)
+            if array_decl is not None:
+                arrays.append(array_decl)
+        statement = self.visit(node.compound_statement)
+        if not arrays:
+            return statement
+
+        def block(frame):
+            # every activation gets arrays of its own
+            slots = frame.slots
+            for slot, element_type, size in arrays:
+                slots[slot] = new_array(element_type, size)
+            statement(frame)
+        return block
+
+    def visit_VarDecl(self, node):
+        """Return (slot, element type, size) of an array declaration,
+        else None."""
+        type_node = node.type_node
+        if isinstance(type_node, ArrayType):
+            return (node.var_node.slot, type_node.type_node.value,
+                    type_node.hi - type_node.lo + 1)
+        return None
+
+    def visit_ProcedureDecl(self, node):
+        proc_symbol = self.scope.lookup(node.proc_name, True)
+        if proc_symbol in self.bodies:
+            # compiled on demand already
+            return
+        cell = self.bodies[proc_symbol] = [None]
+        enclosing_scope = self.scope
+        self.scope = self.scopes[node.proc_name]
+        cell[0] = self.visit(node.block_node)
+        self.scope = enclosing_scope
+
+    def visit_FunctionDecl(self, node):
+        self.visit_ProcedureDecl(node)
+
+    ###########################################################################
+    # statements
+
+    def visit_NoOp(self, node):
+        def noop(frame):
+            pass
+        return noop
+
+    def visit_Compound(self, node):
+        statements = tuple(
+            self.visit(child) for child in node.children
+            if not isinstance(child, NoOp)
+        )
+        if len(statements) == 1:
+            return statements[0]
+
+        def compound(frame):
+            for statement in statements:
+                statement(frame)
+        return compound
+
+    def visit_Assign(self, node):
+        var = node.left
+        value = self.visit(node.right)
+        if isinstance(var, Index):
+            return self.assign_element(var, value)
+        if not isinstance(var, Var):
+            # ArrayVar: copy into the array or fill it
+            values = self.visit(var.var)
+
+            def assign_array(frame):
+                assign_values(values(frame), value(frame))
+            return assign_array
+
+        slot = var.slot
+        if var.level == self.scope.scope_level:
+            def assign_local(frame):
+                frame.slots[slot] = value(frame)
+            return assign_local
+
+        level = var.level
+
+        def assign(frame):
+            frame.display[level][slot] = value(frame)
+        return assign
+
+    def assign_element(self, node, value):
+        values = self.visit(node.var)
+        index = self.visit(node.index)
+        lo, hi = node.lo, node.hi
+
+        def assign_element(frame):
+            result = value(frame)
+            i = index(frame)
+            if not lo <= i <= hi:
+                raise Exception(f'Error: Index {i} out of range {lo}..{hi}')
+            values(frame)[i - lo] = result
+        return assign_element
+
+    def visit_IfElse(self, node):
+        condition = self.visit(node.result)
+        true_statement = self.visit(node.true_statement)
+        if isinstance(node.false_statement, NoOp):
+            def if_then(frame):
+                if condition(frame):
+                    true_statement(frame)
+            return if_then
+
+        false_statement = self.visit(node.false_statement)
+
+        def if_else(frame):
+            if condition(frame):
+                true_statement(frame)
+            else:
+                false_statement(frame)
+        return if_else
+
+    def visit_While(self, node):
+        condition = self.visit(node.result)
+        statement = self.visit(node.statement)
+
+        def while_loop(frame):
+            while condition(frame):
+                statement(frame)
+        return while_loop
+
+    def visit_For(self, node):
+        init = self.visit(node.beg)
+        end = self.visit(node.end)
+        statement = self.visit(node.statement)
+        loop_var = node.beg.left
+        level, slot = loop_var.level, loop_var.slot
+        if node.counted:
+            def counted_loop(frame):
+                init(frame)
+                slots = frame.display[level]
+                first = slots[slot]
+                last = end(frame)
+                for i in range(first, last + 1):
+                    slots[slot] = i
+                    statement(frame)
+                slots[slot] = max(first, last + 1)
+            return counted_loop
+
+        def for_loop(frame):
+            init(frame)
+            slots = frame.display[level]
+            i = slots[slot]
+            last = end(frame)
+            while i <= last:
+                statement(frame)
+                i = slots[slot] + 1
+                slots[slot] = i
+        return for_loop
+
+    def visit_Call(self, node):
+        proc_symbol = self.scope.lookup(node.procedure)
+        cell = self.bodies.get(proc_symbol)
+        if cell is None:
+            if proc_symbol not in self.blocks:
+                return self.builtin(node)
+            cell = self.routine(proc_symbol)
+
+        scope = self.scopes[node.procedure]
+        params = tuple(
+            (formal.slot, self.visit(actual))
+            for formal, actual in zip(proc_symbol.params, node.params)
+        )
+
+        def call(frame):
+            callee = Frame(scope, frame)
+            slots = callee.slots
+            for slot, value in params:
+                slots[slot] = value(frame)
+            cell[0](callee)
+            return slots[0]
+        return call
+
+    def builtin(self, node):
+        if node.procedure == 'WRITELN':
+            values = tuple(self.visit(param) for param in node.params)
+            write = self.output.writeln
+
+            def writeln(frame):
+                for value in values:
+                    write(value(frame))
+            return writeln
+
+        if node.procedure == 'READLN':
+            targets = []
+            for param in node.params:
+                p_type = self.scope.lookup(param.value).type.name
+                convert = {INTEGER: int, REAL: float}.get(p_type, str)
+                targets.append((param.level, param.slot, convert))
+
+            flush = self.output.flush
+            read = self.input.readln
+
+            def readln(frame):
+                flush()
+                for level, slot, convert in targets:
+                    frame.display[level][slot] = convert(read())
+            return readln
+
+        raise Exception(f'Error: Unknown builtin \'{node.procedure}\'')
+
+    ###########################################################################
+    # expressions
+
+    def visit_Num(self, node):
+        value = node.value
+
+        def constant(frame):
+            return value
+        return constant
+
+    visit_String = visit_Num
+
+    def visit_Var(self, node):
+        slot = node.slot
+        if node.level == self.scope.scope_level:
+            def local(frame):
+                return frame.slots[slot]
+            return local
+
+        level = node.level
+
+        def nonlocal_(frame):
+            return frame.display[level][slot]
+        return nonlocal_
+
+    def visit_Index(self, node):
+        values = self.visit(node.var)
+        index = self.visit(node.index)
+        lo, hi = node.lo, node.hi
+
+        def element(frame):
+            i = index(frame)
+            if not lo <= i <= hi:
+                raise Exception(f'Error: Index {i} out of range {lo}..{hi}')
+            return values(frame)[i - lo]
+        return element
+
+    def visit_ArrayOp(self, node):
+        op = node.op.type
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        def array_op(frame):
+            return elementwise(op, left(frame), right(frame))
+        return array_op
+
+    def visit_UnaryOp(self, node):
+        expr = self.visit(node.expr)
+        if node.op.type == MINUS:
+            def negate(frame):
+                return -expr(frame)
+            return negate
+
+        def plus(frame):
+            return +expr(frame)
+        return plus
+
+    def visit_BinOp(self, node):
+        op = node.op.type
+        if op == FLOAT_DIV:
+            left = self.visit(node.left)
+            right = self.visit(node.right)
+
+            def divide(frame):
+                return float(left(frame)) / float(right(frame))
+            return divide
+        return self.binary(op, node.left, node.right)
+
+    def visit_Condition(self, node):
+        return self.binary(node.op_type, node.left, node.right)
+
+    def binary(self, op, left_node, right_node):
+        """Compile a binary operator, specialized on its operand kinds."""
+        left_kind, left = self.operand(left_node)
+        right_kind, right = self.operand(right_node)
+        factory = BINARY_CLOSURES[op].get((left_kind, right_kind))
+        if factory is not None:
+            return factory(left, right)
+        # fall back to closures for both operands
+        if left_kind != 'any':
+            left = self.visit(left_node)
+        if right_kind != 'any':
+            right = self.visit(right_node)
+        return BINARY_CLOSURES[op][('any', 'any')](left, right)
+
+    def operand(self, node):
+        """Classify an operand as ('local', slot), ('const', value) or
+        ('any', closure)."""
+        if isinstance(node, Var) and node.level == self.scope.scope_level:
+            return 'local', node.slot
+        if isinstance(node, (Num, String)):
+            return 'const', node.value
+        return 'any', self.visit(node)
+
+
+def _add():
+    def local_const(i, c):
+        def add(frame):
+            return frame.slots[i] + c
+        return add
+
+    def local_local(i, j):
+        def add(frame):
+            slots = frame.slots
+            return slots[i] + slots[j]
+        return add
+
+    def any_const(f, c):
+        def add(frame):
+            return f(frame) + c
+        return add
+
+    def any_any(f, g):
+        def add(frame):
+            return f(frame) + g(frame)
+        return add
+    return {('local', 'const'): local_const, ('local', 'local'): local_local,
+            ('any', 'const'): any_const, ('any', 'any'): any_any}
+
+
+def _sub():
+    def local_const(i, c):
+        def sub(frame):
+            return frame.slots[i] - c
+        return sub
+
+    def local_local(i, j):
+        def sub(frame):
+            slots = frame.slots
+            return slots[i] - slots[j]
+        return sub
+
+    def any_const(f, c):
+        def sub(frame):
+            return f(frame) - c
+        return sub
+
+    def any_any(f, g):
+        def sub(frame):
+            return f(frame) - g(frame)
+        return sub
+    return {('local', 'const'): local_const, ('local', 'local'): local_local,
+            ('any', 'const'): any_const, ('any', 'any'): any_any}
+
+
+def _mul():
+    def local_const(i, c):
+        def mul(frame):
+            return frame.slots[i] * c
+        return mul
+
+    def local_local(i, j):
+        def mul(frame):
+            slots = frame.slots
+            return slots[i] * slots[j]
+        return mul
+
+    def any_const(f, c):
+        def mul(frame):
+            return f(frame) * c
+        return mul
+
+    def any_any(f, g):
+        def mul(frame):
+            return f(frame) * g(frame)
+        return mul
+    return {('local', 'const'): local_const, ('local', 'local'): local_local,
+            ('any', 'const'): any_const, ('any', 'any'): any_any}
+
+
+def _div():
+    def any_const(f, c):
+        def div(frame):
+            return f(frame) // c
+        return div
+
+    def any_any(f, g):
+        def div(frame):
+            return f(frame) // g(frame)
+        return div
+    return {('any', 'const'): any_const, ('any', 'any'): any_any}
+
+
+def _less():
+    def local_const(i, c):
+        def less(frame):
+            return frame.slots[i] < c
+        return less
+
+    def local_local(i, j):
+        def less(frame):
+            slots = frame.slots
+            return slots[i] < slots[j]
+        return less
+
+    def any_const(f, c):
+        def less(frame):
+            return f(frame) < c
+        return less
+
+    def any_any(f, g):
+        def less(frame):
+            return f(frame) < g(frame)
+        return less
+    return {('local', 'const'): local_const, ('local', 'local'): local_local,
+            ('any', 'const'): any_const, ('any', 'any'): any_any}
+
+
+def _greater():
+    def local_const(i, c):
+        def greater(frame):
+            return frame.slots[i] > c
+        return greater
+
+    def local_local(i, j):
+        def greater(frame):
+            slots = frame.slots
+            return slots[i] > slots[j]
+        return greater
+
+    def any_const(f, c):
+        def greater(frame):
+            return f(frame) > c
+        return greater
+
+    def any_any(f, g):
+        def greater(frame):
+            return f(frame) > g(frame)
+        return greater
+    return {('local', 'const'): local_const, ('local', 'local'): local_local,
+            ('any', 'const'): any_const, ('any', 'any'): any_any}
+
+
+def _equal():
+    def local_const(i, c):
+        def equal(frame):
+            return frame.slots[i] == c
+        return equal
+
+    def any_const(f, c):
+        def equal(frame):
+            return f(frame) == c
+        return equal
+
+    def any_any(f, g):
+        def equal(frame):
+            return f(frame) == g(frame)
+        return equal
+    return {('local', 'const'): local_const, ('any', 'const'): any_const,
+            ('any', 'any'): any_any}
+
+
+# operator -> {(left kind, right kind): closure factory}
+BINARY_CLOSURES = {
+    PLUS: _add(),
+    MINUS: _sub(),
+    MUL: _mul(),
+    INTEGER_DIV: _div(),
+    LESS_THAN: _less(),
+    GREATER_THAN: _greater(),
+    EQUAL: _equal(),
+}
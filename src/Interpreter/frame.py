@@ -3,25 +3,96 @@ import logging
 
 
 class Frame(object):
+    __slots__ = ('scope', 'slots', 'enclosing_frame', 'display', 'tail_args',
+                 'line')
+
     def __init__(self, scope, enclosing_frame=None):
         self.scope = scope
-        self.data = {}
+        # values indexed by symbol slot, slot 0 holds the function result
+        self.slots = [None] * scope.slot_count
+        self.enter(enclosing_frame)
+
+    def enter(self, enclosing_frame):
+        """Link the frame to the calling frame `enclosing_frame`."""
         self.enclosing_frame = enclosing_frame
-        self.return_value = None
+        # display[level] is the slot list of the innermost active frame
+        # of the lexically enclosing scope at that level, so a resolved
+        # (level, slot) address is read as display[level][slot]
+        if enclosing_frame is None:
+            display = [None] * self.scope.scope_level
+        else:
+            display = enclosing_frame.display[:self.scope.scope_level]
+        display.append(self.slots)
+        self.display = display
+        # arguments of a pending tail call of the routine by itself,
+        # see Interpreter.visit_Call
+        self.tail_args = None
+        # source line of the statement running in the frame, kept by
+        # SampledInterpreter only
+        self.line = None
+
+    @property
+    def return_value(self):
+        return self.slots[0]
+
+    @return_value.setter
+    def return_value(self, value):
+        self.slots[0] = value
+
+    def resolve(self, name):
+        """Return the slot list and slot index holding `name`."""
+        scope = self.scope
+        while scope is not None:
+            symbol = scope.lookup(name, True)
+            if symbol is not None:
+                return self.display[scope.scope_level], symbol.slot
+            scope = scope.enclosing_scope
+        raise Exception(f'Error: Symbol(identifier) not found \'{name}\'')
 
     def set(self, name, value):
         if name == self.scope.scope_name:
             self.return_value = value
             return
-        symbol = self.scope.lookup(name, True)
-        if symbol is None:
-            self.enclosing_frame.set(name, value)
-        else:
-            logging.debug(f' set {symbol} to {value}')
-            self.data[name] = value
+        slots, slot = self.resolve(name)
+        logging.debug(f' set {name} to {value}')
+        slots[slot] = value
 
     def get(self, name):
-        symbol = self.scope.lookup(name, True)
-        if symbol is None:
-            return self.enclosing_frame.get(name)
-        return self.data.get(name)
+        slots, slot = self.resolve(name)
+        return slots[slot]
+
+
+class FramePool(object):
+    """Free lists of frames, one per scope.
+
+    A returning call gives its frame back with `release`, the next call
+    of the same scope gets it from `acquire`, reset, instead of a newly
+    allocated frame and slot list. Calls nest, so a scope never holds
+    more frames than its deepest recursion.
+    """
+
+    def __init__(self):
+        # scope -> (frames ready for reuse, a tuple of None as long as
+        # their slot lists)
+        self.free = {}
+        self.allocated = 0
+        # allocations saved
+        self.reused = 0
+
+    def acquire(self, scope, enclosing_frame):
+        entry = self.free.get(scope)
+        if entry is None:
+            self.free[scope] = ([], (None,) * scope.slot_count)
+        elif entry[0]:
+            frame = entry[0].pop()
+            frame.slots[:] = entry[1]
+            frame.enter(enclosing_frame)
+            self.reused += 1
+            return frame
+        self.allocated += 1
+        return Frame(scope, enclosing_frame)
+
+    def release(self, frame):
+        """Keep `frame` of a returned call for the next call of its
+        scope."""
+        self.free[frame.scope][0].append(frame)
@@ -0,0 +1,114 @@
+import codecs
+import mmap
+import sys
+
+BLOCK_SIZE = 1 << 20
+
+
+def read_blocks(stream, block_size=BLOCK_SIZE):
+    """Generate the bytes of the binary `stream` in blocks of at most
+    `block_size` bytes.
+
+    `read1` makes at most one system call and returns what is available,
+    so reading from a pipe or terminal never waits for a whole block.
+    """
+    read = getattr(stream, 'read1', stream.read)
+    while True:
+        block = read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def read_file_blocks(path, block_size=BLOCK_SIZE):
+    """Generate the bytes of the file at `path` in blocks of at most
+    `block_size` bytes, closing the file when done."""
+    with open(path, 'rb') as f:
+        yield from read_blocks(f, block_size)
+
+
+def map_blocks(path, block_size=BLOCK_SIZE):
+    """Generate the bytes of the file at `path` in blocks of
+    `block_size` bytes, read from a memory map of the file."""
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can not be mapped
+            return
+        with mapped:
+            for start in range(0, len(mapped), block_size):
+                yield mapped[start:start + block_size]
+
+
+def split_lines(text):
+    """Split `text` at every line break, the part after the last one
+    included."""
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.split('\n')
+
+
+class Input(object):
+    """Line input of READLN, read in blocks.
+
+    Every refill decodes a whole block and splits it into lines at once,
+    so most READLN calls just take the next line of a list. Lines are
+    returned like `input()` returns them, without the line break, and
+    reading past the end raises EOFError. '\n', '\r\n' and a bare '\r'
+    all end a line, as for `str.splitlines`.
+    """
+
+    def __init__(self, blocks=None, encoding='utf-8'):
+        # standard input is looked up on the first read
+        self.blocks = iter(blocks) if blocks is not None else None
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.lines = []
+        self.index = 0
+        # the unterminated end of the last block
+        self.partial = ''
+        self.eof = False
+
+    @classmethod
+    def from_file(cls, path, block_size=BLOCK_SIZE, use_mmap=False):
+        if use_mmap:
+            return cls(map_blocks(path, block_size))
+        return cls(read_file_blocks(path, block_size))
+
+    def readln(self):
+        index = self.index
+        if index == len(self.lines):
+            self.fill()
+            index = 0
+        self.index = index + 1
+        return self.lines[index]
+
+    def fill(self):
+        """Read blocks until there is at least one whole line."""
+        if self.blocks is None:
+            self.blocks = read_blocks(sys.stdin.buffer)
+        lines = []
+        while not lines:
+            if self.eof:
+                raise EOFError('EOF when reading a line')
+            block = next(self.blocks, None)
+            if block is None:
+                self.eof = True
+                text = self.partial + self.decoder.decode(b'', True)
+                self.partial = ''
+                if text:
+                    lines = split_lines(text)
+                    if not lines[-1]:
+                        # the text ends with a line break
+                        lines.pop()
+            else:
+                text = self.partial + self.decoder.decode(block)
+                held = ''
+                if text.endswith('\r'):
+                    # the '\n' of a '\r\n' may start the next block
+                    text = text[:-1]
+                    held = '\r'
+                lines = split_lines(text)
+                self.partial = lines.pop() + held
+        self.lines = lines
+        self.index = 0
@@ -1,32 +1,150 @@
 from Lexer.lexer import Lexer
+from Lexer.scanner import Scanner
 from Lexer.token_types import *
+from Optimizer.optimizer import Optimizer
+from Parser.ast import ArrayType, Index, Var
 from Parser.visitor import NodeVisitor
 from Parser.myparser import Parser
 from Semantic.semantic import SemanticAnalyzer
-from Semantic.symbol import ScopedSymbolTable
-from .frame import Frame
+from .arrays import assign, elementwise, new_array
+from .frame import Frame, FramePool
+from .input import Input
+from .memo import MEMO_SIZE, MemoTable
+from .metrics import count_nodes
+from .output import Output
+from contextlib import nullcontext
 import logging
-import sys
+
+
+# type name -> conversion of an input line read by READLN
+CONVERTERS = {
+    INTEGER: int,
+    REAL: float,
+}
 
 
 class Interpreter(NodeVisitor):
 
-    def __init__(self, text=None):
+    def __init__(self, text=None, lexer_class=Scanner, path=None,
+                 stream=False, cache=None, optimize=0, memoize=None,
+                 memo_size=MEMO_SIZE, output=None, input=None, metrics=None,
+                 program=None, bindings=None):
         self.call_stack = []
         self.current_frame = None
+        # where WRITELN writes to, buffered
+        self.output = output if output is not None else Output()
+        # where READLN reads from
+        self.input = input if input is not None else Input()
+        # memoize is None (off), True (every pure function) or a
+        # collection of function names; results are kept per function
+        self.memoize = memoize
+        self.memo_size = memo_size
+        # function name -> MemoTable, created on the first call
+        self.memo_tables = {}
+        # frames of returned calls, reused by the next calls; its
+        # `reused` counter is the number of frame allocations saved
+        self.frame_pool = FramePool()
+        # Metrics recording what each phase costs, or None
+        self.metrics = metrics
+        # slot -> initial value of the main program's variables
+        self.bindings = bindings
+
+        if program is not None:
+            # a CompiledProgram, compiled and optimized already
+            self.tree, self.scopes = program.tree, program.scopes
+        else:
+            self.tree, self.scopes = self.load(
+                text, lexer_class, path, stream, cache, optimize)
 
+        if memoize not in (None, True):
+            for name in memoize:
+                scope = self.scopes.get(name)
+                symbol = scope and scope.enclosing_scope.lookup(name, True)
+                if symbol is None or not symbol.pure:
+                    logging.warning(f' {name} is not a pure function, '
+                                    'it is not memoized')
+
+    def load(self, text, lexer_class, path, stream, cache, optimize):
+        """Return the optimized (tree, scopes) of the source, from the
+        cache if it is there."""
         if text is None:
-            text = open(f'{sys.argv[1]}', 'r').read()
+            if path is None:
+                raise Exception('Error: No source text or path given')
+            if not stream:
+                text = open(path, 'r').read()
+
+        key = None
+        compiled = None
+        if cache is not None:
+            with self.phase('load') as phase:
+                key = cache.key(text) if text is not None \
+                    else cache.file_key(path)
+                compiled = cache.load(key)
+                if phase is not None:
+                    phase.counts['hit'] = compiled is not None
+        if compiled is not None:
+            tree, scopes = compiled
+        else:
+            tree, scopes = self.compile(text, lexer_class, path, stream)
+            if cache is not None:
+                cache.store(key, tree, scopes)
+
+        # the cache holds the unoptimized program, so that every
+        # optimization level can share it
+        with self.phase('optimize'):
+            Optimizer(optimize).optimize(tree)
+        return tree, scopes
 
-        lexer = Lexer(text)
-        parser = Parser(lexer)
-        self.tree = parser.parse()
+    def compile(self, text, lexer_class, path, stream):
+        """Parse and analyze the source, return (tree, scopes)."""
+        tokens = None
+        with self.phase('lex') as phase:
+            if stream:
+                # never hold the whole source or token list in memory;
+                # the tokens are scanned while parsing
+                lexer = lexer_class.from_file(path)
+            else:
+                lexer = lexer_class(text)
+                tokens = lexer.tokenize()
+                if phase is not None:
+                    phase.counts['tokens'] = len(tokens)
+        with self.phase('parse') as phase:
+            parser = Parser(lexer, stream=stream, tokens=tokens)
+            tree = parser.parse()
+            if phase is not None:
+                phase.counts['nodes'] = count_nodes(tree)
 
-        semantic_analyzer = SemanticAnalyzer()
-        self.scopes = semantic_analyzer.analyze(self.tree)
+        with self.phase('analyze') as phase:
+            semantic_analyzer = SemanticAnalyzer()
+            scopes = semantic_analyzer.analyze(tree)
+            if phase is not None:
+                phase.counts['symbols'] = sum(
+                    len(scope._symbols) for scope in scopes.values())
+                phase.counts['scopes'] = len(scopes)
+        return tree, scopes
+
+    def phase(self, name):
+        """Return a context manager measuring its body as the phase
+        `name` of the metrics, yielding its PhaseMetrics, or yielding
+        None when there are no metrics."""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(name)
+
+    def execution_counts(self):
+        """Return the counts of the 'execute' phase."""
+        return {
+            # the frame of the main program is not pooled
+            'frames_allocated': self.frame_pool.allocated + 1,
+            'frames_reused': self.frame_pool.reused,
+        }
 
     def visit_Program(self, node):
         frame = Frame(self.scopes['_global'])
+        if self.bindings:
+            slots = frame.slots
+            for slot, value in self.bindings.items():
+                slots[slot] = value
         self.current_frame = frame
         self.call_stack.append(frame)
         self.visit(node.block)
@@ -39,8 +157,12 @@ class Interpreter(NodeVisitor):
         self.visit(node.compound_statement)
 
     def visit_VarDecl(self, node):
-        # Do nothing
-        pass
+        type_node = node.type_node
+        if type_node.__class__ is ArrayType:
+            # every activation gets arrays of its own
+            var = node.var_node
+            self.current_frame.display[var.level][var.slot] = new_array(
+                type_node.type_node.value, type_node.hi - type_node.lo + 1)
 
     def visit_Type(self, node):
         # Do nothing
@@ -81,10 +203,23 @@ class Interpreter(NodeVisitor):
         loop_var = node.beg.left
         beg = self.visit(loop_var)
         end = self.visit(node.end)
+        if node.counted:
+            # the body never writes the loop variable, so the counter
+            # can be stored into its slot without being read back
+            slots = self.current_frame.display[loop_var.level]
+            slot = loop_var.slot
+            statement = node.statement
+            visit = self.visit
+            for i in range(beg, end + 1):
+                slots[slot] = i
+                visit(statement)
+            # the value the loop variable ends with, as below
+            slots[slot] = max(beg, end + 1)
+            return
         while beg <= end:
             self.visit(node.statement)
             beg = self.visit(loop_var) + 1
-            self.current_frame.set(loop_var.value, beg)
+            self.current_frame.display[loop_var.level][loop_var.slot] = beg
 
     def visit_Num(self, node):
         return node.value
@@ -104,14 +239,42 @@ class Interpreter(NodeVisitor):
             self.visit(child)
 
     def visit_Assign(self, node):
-        var_name = node.left.value
+        var = node.left
         var_value = self.visit(node.right)
-        self.current_frame.set(var_name, var_value)
+        if var.__class__ is Var:
+            self.current_frame.display[var.level][var.slot] = var_value
+        elif var.__class__ is Index:
+            array_var = var.var
+            values = self.current_frame.display[array_var.level][
+                array_var.slot]
+            values[self.offset(var)] = var_value
+        else:
+            # ArrayVar: copy into the array or fill it
+            array_var = var.var
+            assign(self.current_frame.display[array_var.level][
+                array_var.slot], var_value)
 
     def visit_Var(self, node):
-        var_name = node.value
-        var_value = self.current_frame.get(var_name)
-        return var_value
+        return self.current_frame.display[node.level][node.slot]
+
+    def visit_Index(self, node):
+        var = node.var
+        values = self.current_frame.display[var.level][var.slot]
+        return values[self.offset(node)]
+
+    def offset(self, node):
+        """Return the offset of the element `node` indexes, checked
+        against the bounds of the array."""
+        index = self.visit(node.index)
+        if not node.lo <= index <= node.hi:
+            raise Exception(
+                f'Error: Index {index} out of range {node.lo}..{node.hi}'
+            )
+        return index - node.lo
+
+    def visit_ArrayOp(self, node):
+        return elementwise(
+            node.op.type, self.visit(node.left), self.visit(node.right))
 
     def visit_NoOp(self, node):
         pass
@@ -123,52 +286,115 @@ class Interpreter(NodeVisitor):
     def visit_FunctionDecl(self, node):
         self.visit_ProcedureDecl(node)
 
-    def call_bulidin(self, node):
+    def call_bulidin(self, node, targets):
         call_name = node.procedure
         if call_name == 'WRITELN':
+            writeln = self.output.writeln
             for p in node.params:
-                r = self.visit(p)
-                print(r)
+                writeln(self.visit(p))
         elif call_name == 'READLN':
-            for p in node.params:
-                t = input()
-                p_type = self.current_frame.scope.lookup(p.value).type.name
-                if p_type == INTEGER:
-                    t = int(t)
-                elif p_type == REAL:
-                    t = float(t)
-                self.current_frame.set(p.value, t)
+            self.output.flush()
+            readln = self.input.readln
+            display = self.current_frame.display
+            for level, slot, convert in targets:
+                display[level][slot] = convert(readln())
 
     def visit_Call(self, node):
-        call_name = node.procedure
-        call_node = self.current_frame.get(call_name)
-        level = self.current_frame.scope.scope_level + 1
-        scope = self.scopes.get(call_name)
-        if scope is None:
-            scope = ScopedSymbolTable(
-                call_name, level, self.current_frame.scope)
-        frame = Frame(scope, self.current_frame)
-        self.call_stack.append(frame)
+        if node.tail:
+            # the running call restarts its body with these arguments
+            # once the body returns, instead of nesting a new call
+            self.current_frame.tail_args = [
+                self.visit(a) for a in node.params]
+            return None
+        target = node.target
+        if target is None:
+            target = node.target = self.resolve_call(node)
+        call_node, scope, param_slots, symbol = target
         if call_node is None:
-            self.current_frame = frame
-            self.call_bulidin(node)
-        else:
-            symbol = self.current_frame.scope.lookup(call_name)
-            formal_params = symbol.params
-            actual_params = node.params
-            for f, a in zip(formal_params, actual_params):
-                name = f.name
-                value = self.visit(a)
-                frame.set(name, value)
-            self.current_frame = frame
+            # builtins run in the caller's frame
+            self.call_bulidin(node, param_slots)
+            return None
+
+        args = [self.visit(a) for _, a in zip(param_slots, node.params)]
+        memo = None
+        if self.memoize and symbol.pure:
+            memo = self.memo_table(symbol)
+        if memo is not None:
+            # keyed by type too, 1 and 1.0 are equal but print apart
+            key = tuple([(type(a), a) for a in args])
+            found, result = memo.lookup(key)
+            if found:
+                return result
+
+        frame = self.frame_pool.acquire(scope, self.current_frame)
+        self.call_stack.append(frame)
+        slots = frame.slots
+        for slot, value in zip(param_slots, args):
+            slots[slot] = value
+        self.current_frame = frame
+        self.visit(call_node)
+        while frame.tail_args is not None:
+            # reuse the frame, starting from fresh slots
+            args = frame.tail_args
+            frame.tail_args = None
+            slots[:] = [None] * len(slots)
+            for slot, value in zip(param_slots, args):
+                slots[slot] = value
             self.visit(call_node)
+        return_value = slots[0]
+        if memo is not None:
+            memo.store(key, return_value)
         self.call_stack.pop()
-        return_value = self.current_frame.return_value
         self.current_frame = frame.enclosing_frame
+        self.frame_pool.release(frame)
         return return_value
 
+    def resolve_call(self, node):
+        """Return the inline cache entry of the call `node`: the body,
+        scope, parameter slots and symbol of the called routine. Calls
+        resolve lexically, so the entry holds for every execution of the
+        node.
+
+        The body of a builtin is None; for READLN the entry holds the
+        (level, slot, converter) of each variable read instead of the
+        parameter slots.
+        """
+        call_name = node.procedure
+        call_node = self.current_frame.get(call_name)
+        if call_node is None:
+            targets = ()
+            if call_name == 'READLN':
+                targets = tuple(
+                    (p.level, p.slot, self.converter(p)) for p in node.params)
+            return None, None, targets, None
+        symbol = self.current_frame.scope.lookup(call_name)
+        param_slots = tuple(f.slot for f in symbol.params)
+        return call_node, self.scopes[call_name], param_slots, symbol
+
+    def converter(self, var):
+        """Return the function converting an input line to the type of
+        the variable `var`."""
+        var_type = self.current_frame.scope.lookup(var.value).type
+        return CONVERTERS.get(var_type.name if var_type else None, str)
+
+    def memo_table(self, symbol):
+        """Return the MemoTable of the pure function `symbol`, or None if
+        it is not to be memoized."""
+        table = self.memo_tables.get(symbol.name)
+        if table is None and (self.memoize is True
+                              or symbol.name in self.memoize):
+            table = MemoTable(symbol.name, self.memo_size)
+            self.memo_tables[symbol.name] = table
+        return table
+
     def interpret(self):
         tree = self.tree
         if tree is None:
             return ''
-        return self.visit(tree)
+        with self.phase('execute') as phase:
+            try:
+                return self.visit(tree)
+            finally:
+                self.output.flush()
+                if phase is not None:
+                    phase.counts.update(self.execution_counts())
@@ -0,0 +1,35 @@
+from collections import OrderedDict
+
+MEMO_SIZE = 1024
+
+
+class MemoTable(object):
+    """Results of a pure function keyed by its arguments, evicting the
+    least recently used entry once `maxsize` entries are stored."""
+
+    def __init__(self, name, maxsize=MEMO_SIZE):
+        self.name = name
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Return (True, result) if `key` is stored, else (False, None)."""
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return True, entries[key]
+        self.misses += 1
+        return False, None
+
+    def store(self, key, result):
+        entries = self.entries
+        entries[key] = result
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def __str__(self):
+        return (f'{self.name}: {self.hits} hits, {self.misses} misses, '
+                f'{len(self.entries)}/{self.maxsize} entries')
@@ -0,0 +1,26 @@
+from .interpreter import Interpreter
+
+
+class MeteredInterpreter(Interpreter):
+    """Interpreter that also counts the nodes it visits and the calls
+    it makes, for the 'execute' phase of its metrics. The counting is an
+    override of `visit`, so the plain Interpreter does not pay for it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nodes_visited = 0
+        self.calls = 0
+
+    def visit(self, node):
+        self.nodes_visited += 1
+        return super().visit(node)
+
+    def visit_Call(self, node):
+        self.calls += 1
+        return super().visit_Call(node)
+
+    def execution_counts(self):
+        counts = super().execution_counts()
+        counts['nodes_visited'] = self.nodes_visited
+        counts['calls'] = self.calls
+        return counts
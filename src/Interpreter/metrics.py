@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from time import perf_counter, process_time
+import tracemalloc
+
+from Parser.ast import AST
+
+
+class PhaseMetrics(object):
+    """What one phase of a run (lex, parse, analyze, optimize, load or
+    execute) cost."""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        # peak of the memory traced by tracemalloc during the phase, in
+        # bytes; None when memory is not traced
+        self.peak_memory = None
+        # what the phase produced or did, by name
+        self.counts = {}
+
+    def to_dict(self):
+        return {
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_memory': self.peak_memory,
+            'counts': dict(self.counts),
+        }
+
+
+class Metrics(object):
+    """Per phase metrics of compiling and running a program.
+
+    Pass an instance to the Interpreter as `metrics`: it then records
+    every phase it runs, and `to_dict` returns them all. With
+    `trace_memory` the peak memory of each phase is traced with
+    tracemalloc; the times are measured either way.
+
+    The 'execute' phase is only traced with `trace_execution` too:
+    tracemalloc walks the whole Python stack on every allocation, which
+    makes deeply recursive programs run orders of magnitude slower.
+    """
+
+    def __init__(self, trace_memory=True, trace_execution=False):
+        self.trace_memory = trace_memory
+        self.trace_execution = trace_execution
+        # phase name -> PhaseMetrics, in the order the phases ran
+        self.phases = {}
+        self.started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    @contextmanager
+    def phase(self, name):
+        """Measure the body of the with statement as the phase `name`,
+        yielding its PhaseMetrics."""
+        phase = self.phases[name] = PhaseMetrics(name)
+        if name == 'execute' and not self.trace_execution:
+            # the traces of the earlier phases are not needed any more
+            self.close()
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        wall = perf_counter()
+        cpu = process_time()
+        try:
+            yield phase
+        finally:
+            phase.wall_time = perf_counter() - wall
+            phase.cpu_time = process_time() - cpu
+            if tracing:
+                phase.peak_memory = tracemalloc.get_traced_memory()[1]
+
+    def close(self):
+        """Stop tracing memory if it was started for these metrics."""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def to_dict(self):
+        return {name: phase.to_dict() for name, phase in self.phases.items()}
+
+    def report(self):
+        """Return the metrics as a text table, one line per phase."""
+        out = [f'{"phase":<10} {"wall ms":>10} {"cpu ms":>10} '
+               f'{"peak KiB":>10}  counts']
+        for phase in self.phases.values():
+            peak = '-' if phase.peak_memory is None else \
+                f'{phase.peak_memory / 1024:.1f}'
+            counts = ', '.join(
+                f'{name}={value}' for name, value in phase.counts.items())
+            out.append(f'{phase.name:<10} {phase.wall_time * 1000:>10.3f} '
+                       f'{phase.cpu_time * 1000:>10.3f} {peak:>10}  {counts}')
+        return '\n'.join(out)
+
+
+def count_nodes(tree):
+    """Return the number of AST nodes of `tree`."""
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, AST):
+            continue
+        count += 1
+        for field in node.fields():
+            stack.append(getattr(node, field, None))
+    return count
@@ -0,0 +1,99 @@
+import sys
+
+# flush policies
+FLUSH_SIZE = 'size'     # when the buffer holds `buffer_size` characters
+FLUSH_LINE = 'line'     # after every WRITELN
+FLUSH_EXIT = 'exit'     # only when flushed explicitly (READLN, exit)
+FLUSH_POLICIES = (FLUSH_SIZE, FLUSH_LINE, FLUSH_EXIT)
+
+BUFFER_SIZE = 64 << 10
+
+
+class StdoutSink(object):
+    """Writes to whatever `sys.stdout` is at the time of the write."""
+
+    def write(self, text):
+        stream = sys.stdout
+        stream.write(text)
+        stream.flush()
+
+    def close(self):
+        pass
+
+
+class FileSink(object):
+    def __init__(self, path):
+        self.file = open(path, 'w')
+
+    def write(self, text):
+        self.file.write(text)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class MemorySink(object):
+    """Keeps the output in memory, see `getvalue`."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+    def close(self):
+        pass
+
+
+class Output(object):
+    """Buffered output of WRITELN.
+
+    Every value written becomes a line of text; lines are collected and
+    handed to `sink` in bulk as `flush_policy` says. Whatever the policy,
+    the buffer is flushed before the program reads input, so prompts are
+    shown, and when the program ends.
+    """
+
+    def __init__(self, sink=None, flush_policy=FLUSH_SIZE,
+                 buffer_size=BUFFER_SIZE):
+        if flush_policy not in FLUSH_POLICIES:
+            raise Exception(f'Error: Unknown flush policy \'{flush_policy}\'')
+        self.sink = sink if sink is not None else StdoutSink()
+        self.flush_policy = flush_policy
+        self.buffer_size = buffer_size
+        self.lines = []
+        self.size = 0
+        # one writeln per policy, so writing a value tests nothing else
+        if flush_policy == FLUSH_SIZE:
+            self.writeln = self.writeln_size
+        elif flush_policy == FLUSH_LINE:
+            self.writeln = self.writeln_line
+        else:
+            self.writeln = self.writeln_exit
+
+    def writeln_exit(self, value):
+        self.lines.append(f'{value}\n')
+
+    def writeln_line(self, value):
+        self.sink.write(f'{value}\n')
+
+    def writeln_size(self, value):
+        line = f'{value}\n'
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.sink.write(''.join(self.lines))
+            self.lines.clear()
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        self.sink.close()
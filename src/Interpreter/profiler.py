@@ -0,0 +1,158 @@
+import json
+from time import perf_counter
+from .interpreter import Interpreter
+
+
+class RoutineProfile(object):
+    __slots__ = ('name', 'calls', 'inclusive', 'exclusive', 'active')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        # seconds in the routine and its callees, and in its own
+        # statements only; recursive activations are counted once
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        # activations running, for recursion
+        self.active = 0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'inclusive': self.inclusive,
+            'exclusive': self.exclusive,
+        }
+
+
+class ProfilingInterpreter(Interpreter):
+    """Interpreter measuring where the program spends its time.
+
+    Every routine, builtins and the main program included, gets its
+    number of calls and its inclusive and exclusive wall time; every
+    statement counts its executions by source line. The hooks are
+    overrides of the visit methods, so the plain Interpreter pays
+    nothing for them.
+
+    The time of a call starts before its arguments are evaluated, so
+    calls in the arguments count as its callees. A self tail call counts
+    as a call, its time is part of the call that started the loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # routine name -> RoutineProfile
+        self.routines = {}
+        # source line -> statements executed
+        self.line_hits = {}
+        # time spent in the callees of each running call, innermost last
+        self.child_times = []
+        self.total_time = 0.0
+
+    def profile(self, name):
+        routine = self.routines.get(name)
+        if routine is None:
+            routine = self.routines[name] = RoutineProfile(name)
+        return routine
+
+    def timed(self, routine, visit, node):
+        """Return `visit(node)`, timing it as a call of `routine`."""
+        routine.calls += 1
+        routine.active += 1
+        child_times = self.child_times
+        child_times.append(0.0)
+        start = perf_counter()
+        try:
+            return visit(node)
+        finally:
+            elapsed = perf_counter() - start
+            routine.exclusive += elapsed - child_times.pop()
+            routine.active -= 1
+            if not routine.active:
+                routine.inclusive += elapsed
+            if child_times:
+                child_times[-1] += elapsed
+
+    def visit_Program(self, node):
+        start = perf_counter()
+        try:
+            return self.timed(
+                self.profile(node.name), super().visit_Program, node)
+        finally:
+            self.total_time = perf_counter() - start
+
+    def visit_Call(self, node):
+        self.hit(node)
+        if node.tail:
+            self.profile(node.procedure).calls += 1
+            return super().visit_Call(node)
+        return self.timed(
+            self.profile(node.procedure), super().visit_Call, node)
+
+    def hit(self, node):
+        line = node.line
+        if line is not None:
+            hits = self.line_hits
+            hits[line] = hits.get(line, 0) + 1
+
+    def visit_Assign(self, node):
+        self.hit(node)
+        return super().visit_Assign(node)
+
+    def visit_IfElse(self, node):
+        self.hit(node)
+        return super().visit_IfElse(node)
+
+    def visit_While(self, node):
+        self.hit(node)
+        return super().visit_While(node)
+
+    def visit_For(self, node):
+        self.hit(node)
+        return super().visit_For(node)
+
+    ###########################################################################
+    # reports
+
+    def report(self, lines=20):
+        """Return the text report: the routines by exclusive time and
+        the `lines` most executed source lines."""
+        total = self.total_time or 1.0
+        out = [
+            f'Total time: {self.total_time * 1000:.3f} ms',
+            '',
+            f'{"calls":>10} {"incl ms":>12} {"excl ms":>12} '
+            f'{"excl %":>7} {"us/call":>10}  routine',
+        ]
+        for routine in sorted(self.routines.values(),
+                              key=lambda r: (-r.exclusive, r.name)):
+            out.append(
+                f'{routine.calls:>10} {routine.inclusive * 1000:>12.3f} '
+                f'{routine.exclusive * 1000:>12.3f} '
+                f'{routine.exclusive / total * 100:>7.1f} '
+                f'{routine.inclusive / max(routine.calls, 1) * 1e6:>10.2f}  '
+                f'{routine.name}'
+            )
+        out.extend(['', f'{"hits":>10}  line'])
+        for line, hits in sorted(self.line_hits.items(),
+                                 key=lambda item: (-item[1], item[0]))[:lines]:
+            out.append(f'{hits:>10}  {line}')
+        return '\n'.join(out)
+
+    def to_dict(self):
+        return {
+            'total_time': self.total_time,
+            'routines': [
+                routine.to_dict() for routine in sorted(
+                    self.routines.values(), key=lambda r: -r.exclusive)
+            ],
+            'lines': [
+                {'line': line, 'hits': hits}
+                for line, hits in sorted(self.line_hits.items())
+            ],
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
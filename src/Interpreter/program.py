@@ -0,0 +1,137 @@
+from Lexer.scanner import Scanner
+from Semantic.symbol import ArrayTypeSymbol, VarSymbol
+from .bytecode import BytecodeCompiler
+from .input import Input
+from .interpreter import Interpreter
+from .output import FLUSH_SIZE, MemorySink, Output
+from .recursion import run_deep
+from .vm import VM
+
+# engines a CompiledProgram can run on: both take their input and output
+# per run, so the compiled form is shared by every run
+ENGINES = ('tree', 'vm')
+
+# type name -> check and conversion of a bound value
+BINDERS = {
+    'INTEGER': lambda value: value if type(value) is int else None,
+    'REAL': lambda value: float(value) if type(value) in (int, float)
+    else None,
+    'STRING': lambda value: value if isinstance(value, str) else None,
+}
+
+
+class CompiledProgram(object):
+    """A Pascal program compiled once, to be run any number of times.
+
+    Lexing, parsing, analysis and optimization, plus bytecode generation
+    for the 'vm' engine, happen when the program is compiled; `run`
+    only runs it, in an ExecutionContext of its own with its own input,
+    output and initial values of the global variables. Runs share
+    nothing mutable but the calls' inline caches in the tree, which
+    every run fills in with the same targets, so a program can be run
+    again and again, by several threads too.
+
+    Compile with `CompiledProgram.compile(text)` or
+    `CompiledProgram.compile(path=path)`.
+    """
+
+    __slots__ = ('tree', 'scopes', 'engine', 'bytecode', 'variables')
+
+    def __init__(self, tree, scopes, engine='tree'):
+        if engine not in ENGINES:
+            raise Exception(f'Error: Unknown engine \'{engine}\'')
+        set_attribute = super().__setattr__
+        set_attribute('tree', tree)
+        set_attribute('scopes', scopes)
+        set_attribute('engine', engine)
+        set_attribute('bytecode', BytecodeCompiler(scopes).compile(tree)
+                      if engine == 'vm' else None)
+        # name -> (slot, type name) of the global variables that can be
+        # bound; arrays are allocated by the program itself
+        variables = {}
+        for name, symbol in scopes['_global']._symbols.items():
+            if isinstance(symbol, VarSymbol) and \
+                    not isinstance(symbol.type, ArrayTypeSymbol):
+                variables[name] = (symbol.slot, symbol.type.name)
+        set_attribute('variables', variables)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    @classmethod
+    def compile(cls, text=None, path=None, engine='tree',
+                lexer_class=Scanner, optimize=0, cache=None, metrics=None):
+        """Compile the source `text`, or the file at `path`."""
+        if text is None and path is None:
+            raise Exception('Error: No source text or path given')
+        compiler = Interpreter(text, lexer_class=lexer_class, path=path,
+                               cache=cache, optimize=optimize,
+                               metrics=metrics)
+        return cls(compiler.tree, compiler.scopes, engine)
+
+    def bind(self, bindings):
+        """Return {slot: value} of the initial values `bindings`, by
+        global variable name, checked against the variables' types."""
+        slots = {}
+        for name, value in bindings.items():
+            variable = self.variables.get(name)
+            if variable is None:
+                raise Exception(
+                    f'Error: \'{name}\' is not a global variable')
+            slot, type_name = variable
+            bound = BINDERS[type_name](value)
+            if bound is None:
+                raise Exception(
+                    f'Error: Can\'t bind {value!r} to {name} of type '
+                    f'{type_name}')
+            slots[slot] = bound
+        return slots
+
+    def context(self, stdin=None, stdout=None, bindings=None,
+                flush_policy=FLUSH_SIZE):
+        return ExecutionContext(self, stdin, stdout, bindings, flush_policy)
+
+    def run(self, stdin=None, stdout=None, bindings=None,
+            flush_policy=FLUSH_SIZE):
+        """Run the program once, return its ExecutionContext."""
+        context = self.context(stdin, stdout, bindings, flush_policy)
+        context.run()
+        return context
+
+
+class ExecutionContext(object):
+    """The state of one run of a CompiledProgram.
+
+    `stdin` is what READLN reads: an Input, the whole input as a str, or
+    None for no input at all. `stdout` is the sink WRITELN writes to
+    (see Interpreter.output); by default a MemorySink, whose text
+    `getvalue` returns. `bindings` gives global variables, by name,
+    their values before the program starts. The sink is flushed, not
+    closed, at the end of the run: it belongs to the caller.
+    """
+
+    def __init__(self, program, stdin=None, stdout=None, bindings=None,
+                 flush_policy=FLUSH_SIZE):
+        self.program = program
+        if stdin is None:
+            stdin = Input(())
+        elif isinstance(stdin, str):
+            stdin = Input((stdin.encode(),))
+        self.input = stdin
+        self.sink = stdout if stdout is not None else MemorySink()
+        self.output = Output(self.sink, flush_policy)
+        self.bindings = program.bind(bindings) if bindings else None
+
+    def run(self):
+        program = self.program
+        if program.engine == 'vm':
+            # the VM keeps its own call stack, any depth is fine
+            return VM(program.bytecode, self.output, self.input,
+                      self.bindings).run()
+        interpreter = Interpreter(program=program, output=self.output,
+                                  input=self.input, bindings=self.bindings)
+        return run_deep(interpreter.interpret)
+
+    def getvalue(self):
+        """Return the output of the run, written to a MemorySink."""
+        return self.sink.getvalue()
@@ -0,0 +1,60 @@
+import sys
+import threading
+
+# Every Pascal call nests a dozen or so Python calls in the tree
+# interpreter, a few in the closure engine.
+STACK_SIZE = 512 << 20
+RECURSION_LIMIT = 1000000
+
+
+# guards the process wide settings below across concurrent calls
+_lock = threading.Lock()
+# run_deep calls running, and the recursion limit from before the first
+_runs = 0
+_saved_limit = None
+
+
+def run_deep(function, *args, stack_size=STACK_SIZE,
+             recursion_limit=RECURSION_LIMIT):
+    """Call `function(*args)` on a thread with a `stack_size` bytes stack
+    and a recursion limit of `recursion_limit`, so that deeply recursive
+    programs run without RecursionError or a crash of the interpreter.
+
+    The limit is process wide in Python: it stays raised while any call
+    is running, from any thread, and the one from before the first of
+    them is restored when the last returns. Exceptions (SystemExit
+    included) are raised again in the calling thread.
+    """
+    global _runs, _saved_limit
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = function(*args)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target)
+    with _lock:
+        if not _runs:
+            _saved_limit = sys.getrecursionlimit()
+        _runs += 1
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), recursion_limit))
+    try:
+        with _lock:
+            # the stack size is read when a thread starts
+            old_stack_size = threading.stack_size(stack_size)
+            try:
+                thread.start()
+            finally:
+                threading.stack_size(old_stack_size)
+        thread.join()
+    finally:
+        with _lock:
+            _runs -= 1
+            if not _runs:
+                sys.setrecursionlimit(_saved_limit)
+
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('value')
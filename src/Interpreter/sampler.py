@@ -0,0 +1,148 @@
+from collections import Counter
+import sys
+import threading
+from .interpreter import Interpreter
+
+# seconds between two samples
+SAMPLE_INTERVAL = 0.005
+
+
+class SampledInterpreter(Interpreter):
+    """Interpreter keeping, on the Frame of every running routine, the
+    source line of the statement it is at, for SamplingProfiler.
+
+    `low_water` is the shortest the call stack has been since the
+    profiler last took the mark off the instance: the frames below it
+    have not run since, so the profiler does not look at them again. Each statement costs an
+    attribute store and each call a comparison; the plain Interpreter
+    pays nothing.
+    """
+
+    # no return since the profiler took the mark
+    low_water = sys.maxsize
+
+    def visit_Assign(self, node):
+        self.current_frame.line = node.line
+        return super().visit_Assign(node)
+
+    def visit_IfElse(self, node):
+        self.current_frame.line = node.line
+        return super().visit_IfElse(node)
+
+    def visit_While(self, node):
+        self.current_frame.line = node.line
+        return super().visit_While(node)
+
+    def visit_For(self, node):
+        self.current_frame.line = node.line
+        return super().visit_For(node)
+
+    def visit_Call(self, node):
+        line = node.line
+        if line is not None:
+            # a call statement, not a call in an expression
+            self.current_frame.line = line
+        result = super().visit_Call(node)
+        depth = len(self.call_stack)
+        if depth < self.low_water:
+            self.low_water = depth
+        return result
+
+
+class SamplingProfiler(object):
+    """Statistical profiler of a tree-walking Interpreter.
+
+    A background thread wakes up every `interval` seconds and records
+    the Pascal call stack of the interpreter: the routine of every Frame
+    of `Interpreter.call_stack` and the line it is at, which a
+    SampledInterpreter keeps on the frame; other interpreters give the
+    routines only. Only the frames above the `low_water` mark of a
+    SampledInterpreter are read again, the rest of the stack is the one
+    of the previous sample, so deep recursion is not walked every time.
+
+    Measured on benchmarks/corpus and a 50000 deep recursion, sampling
+    every 5 ms makes a SampledInterpreter run 5 to 35% slower than the
+    plain Interpreter, up to 50% on recursion.pas; most of it is the
+    super() call of every statement.
+
+    The samples are kept as collapsed stacks, "Main:12;Fib:7;Fib:8" with
+    a count, the input format of flame graph tools.
+    """
+
+    def __init__(self, interpreter, interval=SAMPLE_INTERVAL):
+        self.interpreter = interpreter
+        self.interval = interval
+        # stack, a tuple of "routine:line" parts -> samples
+        self.samples = Counter()
+        # the parts of the previous sample
+        self.parts = []
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def run(self, function, *args):
+        """Call `function(*args)`, sampling the interpreter while it
+        runs."""
+        self.start()
+        try:
+            return function(*args)
+        finally:
+            self.stop()
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.interval):
+            stack = self.snapshot()
+            if stack:
+                self.samples[stack] += 1
+
+    def snapshot(self):
+        """Return the Pascal stack of the interpreter as a tuple of
+        "routine:line" parts, outermost first, or None if it is not
+        running."""
+        interpreter = self.interpreter
+        stack = interpreter.call_stack
+        parts = self.parts
+        if isinstance(interpreter, SampledInterpreter):
+            # take the mark off in one step, before reading the frames: a
+            # return from now on sets it again, for the next sample
+            marks = vars(interpreter)
+            low_water = marks.pop('low_water', len(parts))
+            # the frame at the low water mark may have run since
+            keep = max(min(low_water, len(parts)) - 1, 0)
+            frames = stack[keep:]
+            del parts[keep:]
+            if marks.get('low_water', keep + 1) <= keep:
+                # a return below the frames kept while they were read:
+                # they are not this stack's, the next sample reads them
+                return None
+        else:
+            frames = stack[:]
+            del parts[:]
+        if not parts and not frames:
+            return None
+        for frame in frames:
+            name = frame.scope.scope_name if parts else interpreter.tree.name
+            line = frame.line
+            parts.append(name if line is None else f'{name}:{line}')
+        return tuple(parts)
+
+    def folded(self):
+        """Return the samples as collapsed stack lines, most frequent
+        first."""
+        return ''.join(
+            f'{";".join(stack)} {count}\n' for stack, count in
+            sorted(self.samples.items(), key=lambda item: (-item[1], item[0])))
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.folded())
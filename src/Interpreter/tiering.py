@@ -0,0 +1,165 @@
+from time import perf_counter
+from .closures import ClosureCompiler
+from .interpreter import Interpreter
+
+# calls of a routine, or iterations of a loop, before it is compiled
+TIER_THRESHOLD = 1000
+
+
+class Promotion(object):
+    """A routine or loop compiled to closures once it became hot."""
+
+    def __init__(self, kind, name, count, time):
+        # 'routine' or 'loop'
+        self.kind = kind
+        self.name = name
+        # calls or iterations counted when it was promoted
+        self.count = count
+        # seconds since the program started
+        self.time = time
+
+    def __str__(self):
+        unit = 'calls' if self.kind == 'routine' else 'iterations'
+        return (f'{self.kind} {self.name}: promoted after {self.count} '
+                f'{unit}, at {self.time * 1000:.3f} ms')
+
+
+class TieredInterpreter(Interpreter):
+    """Tree-walking interpreter that compiles hot code.
+
+    Every call of a routine and every iteration of a WHILE or FOR loop
+    is counted; once a routine has been called, or a loop has iterated,
+    `tier_threshold` times, it is compiled by the ClosureCompiler and
+    runs as closures from then on. A loop is promoted in the middle of
+    its run: the iterations left run the compiled body. Code that stays
+    cold is never compiled, and the plain Interpreter, which has no
+    counters at all, is unchanged.
+
+    `promotions` lists what was promoted, in order.
+    """
+
+    def __init__(self, *args, tier_threshold=TIER_THRESHOLD, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tier_threshold = tier_threshold
+        # ProcedureSymbol or loop node -> calls or iterations so far
+        self.counts = {}
+        # ProcedureSymbol -> body closure, For node -> statement closure,
+        # While node -> (condition closure, statement closure)
+        self.compiled = {}
+        self.promotions = []
+        self.start = perf_counter()
+        self.compiler = ClosureCompiler(self.scopes, self.output, self.input)
+        if self.tree is not None:
+            self.compiler.declare(self.tree)
+
+    def interpret(self):
+        self.start = perf_counter()
+        return super().interpret()
+
+    def promote(self, kind, name, count):
+        self.promotions.append(
+            Promotion(kind, name, count, perf_counter() - self.start))
+
+    def visit_Call(self, node):
+        target = node.target
+        if target is None:
+            target = node.target = self.resolve_call(node)
+        call_node, scope, param_slots, symbol = target
+        if symbol is None or node.tail:
+            return super().visit_Call(node)
+
+        body = self.compiled.get(symbol)
+        if body is None:
+            count = self.counts.get(symbol, 0) + 1
+            self.counts[symbol] = count
+            if count < self.tier_threshold:
+                return super().visit_Call(node)
+            body = self.compiled[symbol] = \
+                self.compiler.routine(symbol)[0]
+            self.promote('routine', symbol.name, count)
+
+        args = [self.visit(a) for _, a in zip(param_slots, node.params)]
+        frame = self.frame_pool.acquire(scope, self.current_frame)
+        slots = frame.slots
+        for slot, value in zip(param_slots, args):
+            slots[slot] = value
+        self.call_stack.append(frame)
+        body(frame)
+        return_value = slots[0]
+        self.call_stack.pop()
+        self.frame_pool.release(frame)
+        return return_value
+
+    def visit_While(self, node):
+        compiled = self.compiled.get(node)
+        if compiled is None:
+            count = self.counts.get(node, 0)
+            threshold = self.tier_threshold
+            visit = self.visit
+            while count < threshold:
+                if not visit(node.result):
+                    self.counts[node] = count
+                    return
+                visit(node.statement)
+                count += 1
+            self.counts[node] = count
+            scope = self.current_frame.scope
+            compiled = self.compiled[node] = (
+                self.compiler.compile_in(node.result, scope),
+                self.compiler.compile_in(node.statement, scope),
+            )
+            self.promote('loop', f'WHILE in {scope.scope_name}', count)
+        condition, statement = compiled
+        frame = self.current_frame
+        while condition(frame):
+            statement(frame)
+
+    def visit_For(self, node):
+        self.visit(node.beg)
+        loop_var = node.beg.left
+        frame = self.current_frame
+        slots = frame.display[loop_var.level]
+        slot = loop_var.slot
+        beg = i = slots[slot]
+        end = self.visit(node.end)
+
+        statement = self.compiled.get(node)
+        if statement is None:
+            count = self.counts.get(node, 0)
+            left = self.tier_threshold - count
+            visit = self.visit
+            if node.counted:
+                # the same counted iteration as Interpreter.visit_For,
+                # cut short at the threshold
+                stop = min(end + 1, i + max(left, 0))
+                for j in range(i, stop):
+                    slots[slot] = j
+                    visit(node.statement)
+                if stop > i:
+                    count += stop - i
+                    i = slots[slot] = stop
+            else:
+                while i <= end and count < self.tier_threshold:
+                    visit(node.statement)
+                    count += 1
+                    i = slots[slot] + 1
+                    slots[slot] = i
+            self.counts[node] = count
+            if i > end:
+                return
+            statement = self.compiled[node] = self.compiler.compile_in(
+                node.statement, frame.scope)
+            self.promote(
+                'loop', f'FOR {loop_var.value} in {frame.scope.scope_name}',
+                count)
+
+        if node.counted:
+            for i in range(i, end + 1):
+                slots[slot] = i
+                statement(frame)
+            slots[slot] = max(beg, end + 1)
+            return
+        while i <= end:
+            statement(frame)
+            i = slots[slot] + 1
+            slots[slot] = i
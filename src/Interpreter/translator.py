@@ -0,0 +1,303 @@
+from Lexer.token_types import *
+from Parser.ast import (ArrayType, Assign, Call, Compound, For, IfElse, NoOp,
+                        VarDecl, While)
+from Parser.visitor import NodeVisitor
+from .input import Input
+from .output import Output
+
+
+class PythonTranslator(NodeVisitor):
+    """Translates an analyzed program into the source of a Python module.
+
+    The whole program becomes one function, `program()`, whose locals
+    are the global variables; every Pascal procedure or function becomes
+    a nested Python function, so Pascal's lexical scoping maps onto
+    Python closures and `nonlocal`. Pascal names are prefixed (`v_` for
+    variables, `p_` for routines, `r_` for function results) so they can
+    never clash with Python keywords, builtins or helper names.
+
+    Statement visitors emit lines, expression visitors return Python
+    expression strings. The generated module only needs the Python
+    builtins, so it can be written to disk and run or imported without
+    the interpreter.
+    """
+    INDENT = '    '
+
+    BINARY_OPERATORS = {
+        PLUS: '+',
+        MINUS: '-',
+        MUL: '*',
+        INTEGER_DIV: '//',
+        LESS_THAN: '<',
+        GREATER_THAN: '>',
+        EQUAL: '==',
+    }
+
+    def __init__(self, scopes):
+        self.scopes = scopes
+        self.lines = []
+        self.indent = 0
+        self.scope = None
+        # function scopes being translated, indexed by scope level
+        self.scope_stack = [None]
+        self.temporaries = 0
+
+    def translate(self, tree):
+        """Return the Python source of the program `tree`."""
+        self.visit(tree)
+        return '\n'.join(self.lines) + '\n'
+
+    def emit(self, line):
+        self.lines.append(self.INDENT * self.indent + line if line else '')
+
+    def temporary(self, name):
+        self.temporaries += 1
+        return f'_{name}{self.temporaries}'
+
+    ###########################################################################
+    # declarations
+
+    def visit_Program(self, node):
+        self.emit(f'# Translated from the Pascal program {node.name}')
+        self.emit('')
+        self.emit('')
+        self.emit('def program():')
+        self.function_body(self.scopes['_global'], [], node.block)
+        self.emit('')
+        self.emit('')
+        self.emit("if __name__ == '__main__':")
+        self.emit(self.INDENT + 'program()')
+
+    def visit_ProcedureDecl(self, node):
+        scope = self.scopes[node.proc_name]
+        params = [param.var_node.value for param in node.params]
+        signature = ', '.join(f'v_{name}=None' for name in params)
+        self.emit('')
+        self.emit(f'def p_{node.proc_name}({signature}):')
+        self.function_body(scope, params, node.block_node)
+
+    def visit_FunctionDecl(self, node):
+        self.visit_ProcedureDecl(node)
+
+    def function_body(self, scope, params, block):
+        for declaration in block.declarations:
+            if isinstance(declaration, VarDecl) and \
+                    isinstance(declaration.type_node, ArrayType):
+                raise Exception(
+                    'Error: ARRAY is not supported by the python engine')
+        enclosing_scope = self.scope
+        self.scope = scope
+        self.scope_stack.append(scope)
+        self.indent += 1
+
+        is_function = scope.scope_level > 1 and \
+            scope.enclosing_scope.lookup(scope.scope_name).type is not None
+        start = len(self.lines)
+        outer = sorted(
+            self.target_name(var) for var in self.targets(block)
+            if var.level < scope.scope_level
+        )
+        if outer:
+            self.emit('nonlocal ' + ', '.join(outer))
+        for declaration in block.declarations:
+            if isinstance(declaration, VarDecl):
+                name = declaration.var_node.value
+                if name not in params:
+                    self.emit(f'v_{name} = None')
+        if is_function:
+            self.emit(f'r_{scope.scope_name} = None')
+        self.visit(block)
+        if is_function:
+            self.emit(f'return r_{scope.scope_name}')
+        elif len(self.lines) == start:
+            self.emit('pass')
+
+        self.indent -= 1
+        self.scope_stack.pop()
+        self.scope = enclosing_scope
+
+    def targets(self, block):
+        """Generate the Var nodes assigned by the statements of `block`,
+        nested routines excluded."""
+        stack = [block.compound_statement]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Compound):
+                stack.extend(node.children)
+            elif isinstance(node, Assign):
+                yield node.left
+            elif isinstance(node, For):
+                yield node.beg.left
+                stack.append(node.statement)
+            elif isinstance(node, IfElse):
+                stack.append(node.true_statement)
+                stack.append(node.false_statement)
+            elif isinstance(node, While):
+                stack.append(node.statement)
+            elif isinstance(node, Call) and node.procedure == 'READLN':
+                yield from node.params
+
+    def target_name(self, var):
+        if var.slot == 0:
+            # the result of an enclosing function
+            return f'r_{self.scope_stack[var.level].scope_name}'
+        return f'v_{var.value}'
+
+    def visit_Block(self, node):
+        for declaration in node.declarations:
+            self.visit(declaration)
+        self.visit(node.compound_statement)
+
+    def visit_VarDecl(self, node):
+        pass
+
+    ###########################################################################
+    # statements
+
+    def statement(self, node):
+        """Emit `node` as an indented block, `pass` if it is empty."""
+        self.indent += 1
+        start = len(self.lines)
+        self.visit(node)
+        if len(self.lines) == start:
+            self.emit('pass')
+        self.indent -= 1
+
+    def visit_NoOp(self, node):
+        pass
+
+    def visit_Compound(self, node):
+        for child in node.children:
+            self.visit(child)
+
+    def visit_Assign(self, node):
+        value = self.expr(node.right)
+        self.emit(f'{self.target_name(node.left)} = {value}')
+
+    def visit_IfElse(self, node):
+        self.emit(f'if {self.expr(node.result)}:')
+        self.statement(node.true_statement)
+        if not isinstance(node.false_statement, NoOp):
+            self.emit('else:')
+            self.statement(node.false_statement)
+
+    def visit_While(self, node):
+        self.emit(f'while {self.expr(node.result)}:')
+        self.statement(node.statement)
+
+    def visit_For(self, node):
+        self.visit(node.beg)
+        var = self.target_name(node.beg.left)
+        end = self.temporary('end')
+        self.emit(f'{end} = {self.expr(node.end)}')
+        self.emit(f'while {var} <= {end}:')
+        self.indent += 1
+        self.visit(node.statement)
+        self.emit(f'{var} = {var} + 1')
+        self.indent -= 1
+
+    def visit_Call(self, node):
+        if node.procedure == 'WRITELN' and self.is_builtin(node):
+            for param in node.params:
+                self.emit(f'print({self.expr(param)})')
+        elif node.procedure == 'READLN' and self.is_builtin(node):
+            for param in node.params:
+                self.emit(f'{self.target_name(param)} = {self.readln(param)}')
+        else:
+            self.emit(self.call(node))
+
+    ###########################################################################
+    # expressions
+
+    def expr(self, node):
+        """Return the Python expression of the expression `node`."""
+        if isinstance(node, Call):
+            return self.call(node)
+        return self.visit(node)
+
+    def visit_Num(self, node):
+        return repr(node.value)
+
+    visit_String = visit_Num
+
+    def visit_Var(self, node):
+        return self.target_name(node)
+
+    def visit_UnaryOp(self, node):
+        return f'({node.op.value}{self.expr(node.expr)})'
+
+    def visit_BinOp(self, node):
+        left = self.expr(node.left)
+        right = self.expr(node.right)
+        if node.op.type == FLOAT_DIV:
+            return f'(float({left}) / float({right}))'
+        return f'({left} {self.BINARY_OPERATORS[node.op.type]} {right})'
+
+    def visit_Condition(self, node):
+        left = self.expr(node.left)
+        right = self.expr(node.right)
+        return f'({left} {self.BINARY_OPERATORS[node.op_type]} {right})'
+
+    def call(self, node):
+        """Return a call of `node` as an expression."""
+        if self.is_builtin(node):
+            # evaluated and written one argument after the other,
+            # the whole expression is None
+            if node.procedure == 'WRITELN':
+                parts = [f'print({self.expr(p)})' for p in node.params]
+            else:
+                parts = [f'({self.target_name(p)} := {self.readln(p)})'
+                         for p in node.params]
+            return f"({', '.join(parts + ['None'])})[-1]"
+        proc_symbol = self.scope.lookup(node.procedure)
+        args = [
+            self.expr(actual)
+            for _, actual in zip(proc_symbol.params, node.params)
+        ]
+        return f"p_{node.procedure}({', '.join(args)})"
+
+    def is_builtin(self, node):
+        return node.procedure not in self.scopes
+
+    def readln(self, var):
+        var_type = self.scope.lookup(var.value).type
+        convert = {INTEGER: 'int', REAL: 'float'}.get(
+            var_type.name if var_type else None)
+        if convert is None:
+            return 'input()'
+        return f'{convert}(input())'
+
+
+def compile_program(tree, scopes):
+    """Translate `tree` and return (source, code object)."""
+    source = PythonTranslator(scopes).translate(tree)
+    return source, compile(source, f'<pascal {tree.name}>', 'exec')
+
+
+def run_program(code, output=None, input=None):
+    """Execute a code object from `compile_program`, writing to `output`
+    and reading from `input`.
+
+    The module's print and input are replaced by the buffered output and
+    a read of the next input line that flushes the output first.
+    """
+    if output is None:
+        output = Output()
+    if input is None:
+        input = Input()
+    readln = input.readln
+
+    def read():
+        output.flush()
+        return readln()
+
+    namespace = {
+        '__name__': 'pascal_program',
+        'print': output.writeln,
+        'input': read,
+    }
+    exec(code, namespace)
+    try:
+        return namespace['program']()
+    finally:
+        output.flush()
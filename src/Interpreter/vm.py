@@ -0,0 +1,175 @@
+import operator
+from .bytecode import *
+from .input import Input
+from .output import Output
+
+
+# opcode -> function of a binary operator or comparison
+BINARY_FUNCTIONS = {
+    BINARY_ADD: operator.add,
+    BINARY_SUB: operator.sub,
+    BINARY_MUL: operator.mul,
+    BINARY_INT_DIV: operator.floordiv,
+    BINARY_FLOAT_DIV: lambda a, b: float(a) / float(b),
+    COMPARE_LESS: operator.lt,
+    COMPARE_GREATER: operator.gt,
+    COMPARE_EQUAL: operator.eq,
+    COMPARE_LESS_EQUAL: operator.le,
+}
+
+
+class VM(object):
+    """Stack machine running a `BytecodeProgram`.
+
+    Frames are plain slot lists and the display is rebuilt on every call
+    exactly like `Frame` does it, so a (level, slot) address means the
+    same thing here as in the tree interpreter. The whole program runs in
+    one dispatch loop, calls included: CALL pushes the return address and
+    the caller's slots and display on a Python list instead of recursing.
+    """
+
+    def __init__(self, program, output=None, input=None, bindings=None):
+        self.program = program
+        self.output = output if output is not None else Output()
+        self.input = input if input is not None else Input()
+        # slot -> initial value of the main program's variables
+        self.bindings = bindings
+
+    def run(self):
+        try:
+            return self.execute()
+        finally:
+            self.output.flush()
+
+    def execute(self):
+        code = self.program.code
+        constants = self.program.constants
+        routines = self.program.routines
+        converters = READ_CONVERTERS
+        writeln = self.output.writeln
+        flush = self.output.flush
+        readln = self.input.readln
+        binary = BINARY_FUNCTIONS
+
+        main = routines[0]
+        slots = [None] * main.frame_size
+        if self.bindings:
+            for slot, value in self.bindings.items():
+                slots[slot] = value
+        display = [None] * main.level + [slots]
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        calls = []
+        pc = main.entry
+
+        # the tests are ordered by how often the opcodes run, so the
+        # hot ones are found after a comparison or two; every binary
+        # operator is one test and a call of its function
+        while True:
+            op = code[pc]
+            if op == LOAD_LOCAL:
+                push(slots[code[pc + 1]])
+                pc += 2
+            elif op == LOAD_CONST:
+                push(constants[code[pc + 1]])
+                pc += 2
+            elif op == BINARY_LOCAL2:
+                push(binary[code[pc + 1]](
+                    slots[code[pc + 2]], slots[code[pc + 3]]))
+                pc += 4
+            elif op == BINARY_LOCAL_CONST:
+                push(binary[code[pc + 1]](
+                    slots[code[pc + 2]], constants[code[pc + 3]]))
+                pc += 4
+            elif op == STORE_LOCAL:
+                slots[code[pc + 1]] = pop()
+                pc += 2
+            elif op == FOR_NEXT:
+                slot = code[pc + 1]
+                i = slots[slot] + 1
+                slots[slot] = i
+                if i <= slots[code[pc + 2]]:
+                    pc = code[pc + 3]
+                else:
+                    pc += 4
+            elif op == BINARY_ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+                pc += 1
+            elif op in binary:
+                right = pop()
+                stack[-1] = binary[op](stack[-1], right)
+                pc += 1
+            elif op == PRINT:
+                writeln(pop())
+                pc += 1
+            elif op == JUMP_IF_NOT_LESS:
+                right = pop()
+                if pop() < right:
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif op == JUMP_IF_NOT_GREATER:
+                right = pop()
+                if pop() > right:
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif op == JUMP_IF_NOT_EQUAL:
+                right = pop()
+                if pop() == right:
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif op == JUMP:
+                pc = code[pc + 1]
+            elif op == CALL:
+                routine = routines[code[pc + 1]]
+                callee = [None] * routine.frame_size
+                nargs = code[pc + 2]
+                if nargs:
+                    args = stack[-nargs:]
+                    del stack[-nargs:]
+                    for slot, value in zip(routine.params, args):
+                        callee[slot] = value
+                calls.append((pc + 3, slots, display))
+                slots = callee
+                display = display[:routine.level] + [slots]
+                pc = routine.entry
+            elif op == RETURN:
+                push(slots[0])
+                pc, slots, display = calls.pop()
+            elif op == LOAD_NONLOCAL:
+                push(display[code[pc + 1]][code[pc + 2]])
+                pc += 3
+            elif op == STORE_NONLOCAL:
+                display[code[pc + 1]][code[pc + 2]] = pop()
+                pc += 3
+            elif op == FOR_PREP:
+                if slots[code[pc + 1]] <= slots[code[pc + 2]]:
+                    pc += 4
+                else:
+                    pc = code[pc + 3]
+            elif op == POP:
+                pop()
+                pc += 1
+            elif op == JUMP_IF_FALSE:
+                if pop():
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif op == UNARY_NEG:
+                stack[-1] = -stack[-1]
+                pc += 1
+            elif op == UNARY_POS:
+                stack[-1] = +stack[-1]
+                pc += 1
+            elif op == READ:
+                flush()
+                push(converters[code[pc + 1]](readln()))
+                pc += 2
+            elif op == HALT:
+                return None
+            else:
+                raise Exception(f'Error: Invalid opcode {op} at {pc}')
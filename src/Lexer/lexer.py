@@ -1,9 +1,14 @@
 from .token_types import *
 
 class Token(object):
-    def __init__(self, type, value):
+    __slots__ = ('type', 'value', 'line', 'column')
+
+    def __init__(self, type, value, line=None, column=None):
         self.type = type
         self.value = value
+        # 1-based source position of the first character of the token
+        self.line = line
+        self.column = column
 
     def __str__(self):
         """String representation of the class instance.
@@ -39,7 +44,9 @@ class Lexer(object):
         'WHILE': Token(WHILE, 'WHILE'),
         'DO': Token(DO, 'DO'),
         'FOR': Token(FOR, 'FOR'),
-        'TO': Token(TO, 'TO')
+        'TO': Token(TO, 'TO'),
+        'ARRAY': Token(ARRAY, 'ARRAY'),
+        'OF': Token(OF, 'OF'),
     }
 
     def __init__(self, text):
@@ -49,13 +56,23 @@ class Lexer(object):
         self.pos = 0
         self.current_char = self.text[self.pos]
         self.is_declaration = False
+        # position of `current_char`
+        self.line = 1
+        self.column = 1
 
     def error(self):
-        raise Exception('Invalid character')
+        raise Exception(
+            f'Invalid character {self.current_char!r} '
+            f'at line {self.line}, column {self.column}'
+        )
 
     def advance(self):
         """Advance the `pos` pointer and set the `current_char` variable."""
+        if self.current_char == '\n':
+            self.line += 1
+            self.column = 0
         self.pos += 1
+        self.column += 1
         if self.pos > len(self.text) - 1:
             self.current_char = None  # Indicates end of input
         else:
@@ -84,7 +101,8 @@ class Lexer(object):
             result += self.current_char
             self.advance()
 
-        if self.current_char == '.':
+        # in `1..10` the dots are a range, not a decimal point
+        if self.current_char == '.' and self.peek() != '.':
             result += self.current_char
             self.advance()
 
@@ -108,14 +126,16 @@ class Lexer(object):
             result += self.current_char
             self.advance()
 
+        keyword = self.RESERVED_KEYWORDS.get(result.upper())
         if self.current_char == '(' and self.is_declaration is False:
             self.advance()
-            token = self.RESERVED_KEYWORDS.get(
-                result.upper(), Token(CALL, result))
+            token = Token(CALL, result) if keyword is None else keyword
         else:
-            token = self.RESERVED_KEYWORDS.get(
-                result.upper(), Token(ID, result))
+            token = Token(ID, result) if keyword is None else keyword
             self.is_declaration = False
+        if token is keyword:
+            # the table entries are shared, hand out a copy
+            token = Token(keyword.type, keyword.value)
         if token.type in (PROCEDURE, FUNCTION):
             self.is_declaration = True
         return token
@@ -146,72 +166,103 @@ class Lexer(object):
                 self.skip_comment()
                 continue
 
-            if self.current_char.isalpha():
-                return self._id()
+            line, column = self.line, self.column
+            token = self._token()
+            token.line = line
+            token.column = column
+            return token
 
-            if self.current_char.isdigit():
-                return self.number()
+        return Token(EOF, None, self.line, self.column)
 
-            if self.current_char == '\'':
-                return self._string()
+    def _token(self):
+        """Consume one token starting at `current_char`."""
+        if self.current_char.isalpha():
+            return self._id()
 
-            if self.current_char == ':' and self.peek() == '=':
-                self.advance()
-                self.advance()
-                return Token(ASSIGN, ':=')
+        if self.current_char.isdigit():
+            return self.number()
 
-            if self.current_char == ';':
-                self.advance()
-                return Token(SEMI, ';')
+        if self.current_char == '\'':
+            return self._string()
 
-            if self.current_char == ':':
-                self.advance()
-                return Token(COLON, ':')
+        if self.current_char == ':' and self.peek() == '=':
+            self.advance()
+            self.advance()
+            return Token(ASSIGN, ':=')
 
-            if self.current_char == ',':
-                self.advance()
-                return Token(COMMA, ',')
+        if self.current_char == ';':
+            self.advance()
+            return Token(SEMI, ';')
 
-            if self.current_char == '+':
-                self.advance()
-                return Token(PLUS, '+')
+        if self.current_char == ':':
+            self.advance()
+            return Token(COLON, ':')
 
-            if self.current_char == '-':
-                self.advance()
-                return Token(MINUS, '-')
+        if self.current_char == ',':
+            self.advance()
+            return Token(COMMA, ',')
 
-            if self.current_char == '*':
-                self.advance()
-                return Token(MUL, '*')
+        if self.current_char == '+':
+            self.advance()
+            return Token(PLUS, '+')
 
-            if self.current_char == '/':
-                self.advance()
-                return Token(FLOAT_DIV, '/')
+        if self.current_char == '-':
+            self.advance()
+            return Token(MINUS, '-')
 
-            if self.current_char == '(':
-                self.advance()
-                return Token(LPAREN, '(')
+        if self.current_char == '*':
+            self.advance()
+            return Token(MUL, '*')
 
-            if self.current_char == ')':
-                self.advance()
-                return Token(RPAREN, ')')
+        if self.current_char == '/':
+            self.advance()
+            return Token(FLOAT_DIV, '/')
 
-            if self.current_char == '.':
-                self.advance()
-                return Token(DOT, '.')
+        if self.current_char == '(':
+            self.advance()
+            return Token(LPAREN, '(')
 
-            if self.current_char == '<':
-                self.advance()
-                return Token(LESS_THAN, '<')
+        if self.current_char == ')':
+            self.advance()
+            return Token(RPAREN, ')')
 
-            if self.current_char == '>':
-                self.advance()
-                return Token(GREATER_THAN, '>')
+        if self.current_char == '.' and self.peek() == '.':
+            self.advance()
+            self.advance()
+            return Token(RANGE, '..')
 
-            if self.current_char == '=':
-                self.advance()
-                return Token(EQUAL, '=')
+        if self.current_char == '.':
+            self.advance()
+            return Token(DOT, '.')
+
+        if self.current_char == '[':
+            self.advance()
+            return Token(LBRACKET, '[')
+
+        if self.current_char == ']':
+            self.advance()
+            return Token(RBRACKET, ']')
 
-            self.error()
+        if self.current_char == '<':
+            self.advance()
+            return Token(LESS_THAN, '<')
 
-        return Token(EOF, None)
+        if self.current_char == '>':
+            self.advance()
+            return Token(GREATER_THAN, '>')
+
+        if self.current_char == '=':
+            self.advance()
+            return Token(EQUAL, '=')
+
+        self.error()
+
+    def tokenize(self):
+        """Return the whole token stream, EOF included, as a list."""
+        tokens = []
+        token = self.get_next_token()
+        while token.type != EOF:
+            tokens.append(token)
+            token = self.get_next_token()
+        tokens.append(token)
+        return tokens
@@ -0,0 +1,159 @@
+import re
+from .token_types import *
+from .lexer import Token, Lexer
+
+
+class Scanner(object):
+    """Single-pass tokenizer driven by one compiled regular expression.
+
+    Produces exactly the same token stream as `Lexer` (including the
+    `CALL` detection for `name(` and the declaration handling after
+    PROCEDURE/FUNCTION) but scans the whole buffer with `finditer`
+    instead of stepping through it one character at a time.
+    """
+    # Every match is one token together with the whitespace and comments
+    # in front of it (group 1); the empty alternative at the end of the
+    # input has no named group.
+    TOKEN_REGEX = re.compile(r"""
+        ((?:\s+|\{[^}]*\})*)
+        (?:
+              (?P<id>[^\W\d_][^\W_]*)(?P<call>\()?
+            | (?P<integer>\d+)(?P<real>\.(?!\.)\d*)?
+            | (?P<op>:=|\.\.|[;:,+\-*/().<>=\[\]])
+            | '(?P<string>[^']*)'?
+            | (?P<error>.)
+            | \Z
+        )
+    """, re.VERBOSE | re.DOTALL)
+
+    OPERATORS = {
+        token_type: token_type
+        for token_type in (SEMI, COLON, COMMA, PLUS, MINUS, MUL, FLOAT_DIV,
+                           LPAREN, RPAREN, DOT, LESS_THAN, GREATER_THAN,
+                           EQUAL, ASSIGN, LBRACKET, RBRACKET, RANGE)
+    }
+
+    # characters read per chunk when streaming a source file
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, text, chunks=None):
+        self.text = text
+        if chunks is None:
+            chunks = ((text, True),)
+        self.tokens = self.scan(chunks)
+        self.eof = None
+
+    @classmethod
+    def from_file(cls, path, chunk_size=None):
+        """Scan `path` lazily, holding one chunk of source at a time."""
+        return cls(None, cls.read_chunks(path, chunk_size or cls.CHUNK_SIZE))
+
+    @staticmethod
+    def read_chunks(path, chunk_size):
+        """Generate (chunk, is_last) pairs of the file at `path`."""
+        with open(path, 'r') as source:
+            chunk = source.read(chunk_size)
+            while True:
+                following = source.read(chunk_size)
+                yield chunk, following == ''
+                if following == '':
+                    return
+                chunk = following
+
+    def error(self, char, line, column):
+        raise Exception(
+            f'Invalid character {char!r} at line {line}, column {column}'
+        )
+
+    def scan(self, chunks):
+        """Generate every token of the source `chunks`, EOF last."""
+        reserved = Lexer.RESERVED_KEYWORDS
+        operators = self.OPERATORS
+        finditer = self.TOKEN_REGEX.finditer
+        is_declaration = False
+        line = 1
+        # absolute offsets of the current line and of `text[0]`
+        line_start = 0
+        base = 0
+        text = ''
+        for chunk, last in chunks:
+            text += chunk
+            previous = 0
+            for match in finditer(text):
+                kind = match.lastgroup
+                if last is False and (
+                    match.end() == len(text) or
+                    kind == 'error' and match.group('error') == '{'
+                ):
+                    # the token may continue in the next chunk: carry the
+                    # unscanned tail over, counting the lines left behind
+                    carry = match.start()
+                    newlines = text.count('\n', previous, carry)
+                    if newlines:
+                        line += newlines
+                        line_start = base + text.rindex(
+                            '\n', previous, carry) + 1
+                    text = text[carry:]
+                    base += carry
+                    break
+
+                start = match.end(1)
+                # newlines can hide in comments, whitespace and strings,
+                # all of which lie between the previous token and this one
+                newlines = text.count('\n', previous, start)
+                if newlines:
+                    line += newlines
+                    line_start = base + text.rindex('\n', previous, start) + 1
+                previous = start
+                column = base + start - line_start + 1
+
+                if kind == 'id' or kind == 'call':
+                    name = match.group('id')
+                    keyword = reserved.get(name.upper())
+                    if kind == 'call' and is_declaration is False:
+                        token_type = CALL if keyword is None else keyword.type
+                        lparen = False
+                    else:
+                        token_type = ID if keyword is None else keyword.type
+                        is_declaration = False
+                        # a declared name keeps its '(' as a separate token
+                        lparen = kind == 'call'
+                    if token_type in (PROCEDURE, FUNCTION):
+                        is_declaration = True
+                    yield Token(token_type,
+                                name if keyword is None else keyword.value,
+                                line, column)
+                    if lparen:
+                        yield Token(LPAREN, '(', line, column + len(name))
+                elif kind == 'op':
+                    token_type = operators[match.group('op')]
+                    yield Token(token_type, token_type, line, column)
+                elif kind == 'integer':
+                    yield Token(INTEGER_CONST, int(match.group('integer')),
+                                line, column)
+                elif kind == 'real':
+                    yield Token(REAL_CONST,
+                                float(match.group('integer') +
+                                      match.group('real')),
+                                line, column)
+                elif kind == 'string':
+                    yield Token(STRING_CONST, match.group('string'),
+                                line, column)
+                elif kind is None:
+                    yield Token(EOF, None, line, column)
+                    return
+                else:
+                    self.error(match.group('error'), line, column)
+
+    def get_next_token(self):
+        if self.eof is not None:
+            # keep answering EOF once the input is exhausted
+            return self.eof
+        token = next(self.tokens)
+        if token.type == EOF:
+            self.eof = token
+        return token
+
+    def tokenize(self):
+        """Return the whole token stream, EOF included, as a list."""
+        return list(self.tokens)
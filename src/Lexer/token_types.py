@@ -14,6 +14,9 @@ GREATER_THAN = '>'
 EQUAL = '='
 LPAREN = '('
 RPAREN = ')'
+LBRACKET = '['
+RBRACKET = ']'
+RANGE = '..'
 ID = 'ID'
 ASSIGN = ':='
 BEGIN = 'BEGIN'
@@ -34,4 +37,6 @@ WHILE = 'WHILE'
 DO = 'DO'
 FOR = 'FOR'
 TO = 'TO'
+ARRAY = 'ARRAY'
+OF = 'OF'
 EOF = 'EOF'
@@ -0,0 +1,222 @@
+import operator
+from Lexer.lexer import Token
+from Lexer.token_types import *
+from Parser.ast import Condition, Num, String, NoOp
+from Parser.visitor import NodeVisitor
+
+# operator -> the Python function computing it, exactly as the
+# interpreter does at run time
+OPERATORS = {
+    PLUS: operator.add,
+    MINUS: operator.sub,
+    MUL: operator.mul,
+    INTEGER_DIV: operator.floordiv,
+    FLOAT_DIV: lambda a, b: float(a) / float(b),
+    LESS_THAN: operator.lt,
+    GREATER_THAN: operator.gt,
+    EQUAL: operator.eq,
+}
+
+
+class Optimizer(NodeVisitor):
+    """Rewrites an analyzed program into an equivalent, cheaper one.
+
+    Level 1 folds constant arithmetic and constant conditions, replaces
+    IF statements whose condition is known by the branch taken, removes
+    WHILE loops that never run and drops empty statements from compound
+    statements. Level 2 also simplifies the identities x + 0, 0 + x,
+    x - 0, x * 1 and 1 * x where x is INTEGER or REAL.
+
+    Every visit method returns the node that replaces the visited one;
+    nodes are rewritten in place where possible. Variable addresses set
+    by the semantic analyzer are kept, so the result runs on any engine.
+    """
+
+    def __init__(self, level=1):
+        self.level = level
+
+    def optimize(self, tree):
+        if self.level > 0:
+            self.visit(tree)
+        return tree
+
+    def constant(self, node):
+        """Return (True, value) if `node` is a literal, else (False, None)."""
+        if isinstance(node, (Num, String)):
+            return True, node.value
+        return False, None
+
+    def literal(self, value, token):
+        """Return a literal node for a folded `value`, positioned at
+        `token`."""
+        if isinstance(value, str):
+            return String(Token(STRING_CONST, value, token.line, token.column))
+        token_type = REAL_CONST if isinstance(value, float) else INTEGER_CONST
+        return Num(Token(token_type, value, token.line, token.column))
+
+    def fold(self, op, left, right):
+        """Return (True, value) if `op` applied to the literals `left` and
+        `right` can be computed now, else (False, None)."""
+        is_const, left_value = self.constant(left)
+        if not is_const:
+            return False, None
+        is_const, right_value = self.constant(right)
+        if not is_const:
+            return False, None
+        try:
+            return True, OPERATORS[op](left_value, right_value)
+        except (ArithmeticError, TypeError):
+            # leave the error to run time
+            return False, None
+
+    def condition_value(self, node):
+        """Return (True, value) if the condition `node` is known."""
+        if isinstance(node, Condition):
+            return self.fold(node.op_type, node.left, node.right)
+        return self.constant(node)
+
+    ###########################################################################
+    # declarations
+
+    def visit_Program(self, node):
+        self.visit(node.block)
+        return node
+
+    def visit_Block(self, node):
+        for declaration in node.declarations:
+            self.visit(declaration)
+        node.compound_statement = self.visit(node.compound_statement)
+        return node
+
+    def visit_VarDecl(self, node):
+        return node
+
+    def visit_ProcedureDecl(self, node):
+        self.visit(node.block_node)
+        return node
+
+    def visit_FunctionDecl(self, node):
+        return self.visit_ProcedureDecl(node)
+
+    ###########################################################################
+    # statements
+
+    def visit_NoOp(self, node):
+        return node
+
+    def visit_Compound(self, node):
+        children = []
+        for child in node.children:
+            child = self.visit(child)
+            if not isinstance(child, NoOp):
+                children.append(child)
+        node.children = children
+        return node
+
+    def visit_Assign(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_IfElse(self, node):
+        node.result = self.visit(node.result)
+        node.true_statement = self.visit(node.true_statement)
+        node.false_statement = self.visit(node.false_statement)
+        is_const, value = self.condition_value(node.result)
+        if not is_const:
+            return node
+        return node.true_statement if value else node.false_statement
+
+    def visit_While(self, node):
+        node.result = self.visit(node.result)
+        node.statement = self.visit(node.statement)
+        is_const, value = self.condition_value(node.result)
+        if is_const and not value:
+            return NoOp()
+        return node
+
+    def visit_For(self, node):
+        node.beg = self.visit(node.beg)
+        node.end = self.visit(node.end)
+        node.statement = self.visit(node.statement)
+        return node
+
+    def visit_Call(self, node):
+        node.params = [self.visit(param) for param in node.params]
+        return node
+
+    ###########################################################################
+    # expressions
+
+    def visit_Num(self, node):
+        return node
+
+    def visit_String(self, node):
+        return node
+
+    def visit_Var(self, node):
+        return node
+
+    def visit_Index(self, node):
+        node.index = self.visit(node.index)
+        return node
+
+    def visit_ArrayVar(self, node):
+        return node
+
+    def visit_ArrayOp(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        node.expr = self.visit(node.expr)
+        is_const, value = self.constant(node.expr)
+        if is_const and not isinstance(value, str):
+            value = -value if node.op.type == MINUS else +value
+            return self.literal(value, node.op)
+        return node
+
+    def visit_BinOp(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        op = node.op.type
+        is_const, value = self.fold(op, node.left, node.right)
+        if is_const:
+            return self.literal(value, node.op)
+        if self.level >= 2:
+            return self.simplify(node)
+        return node
+
+    def visit_Condition(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def simplify(self, node):
+        """Remove an integer 0 or 1 operand that does not change the
+        value of `node`."""
+        if not node.numeric:
+            # 'ab' + 0 must still fail at run time
+            return node
+        op = node.op.type
+        if op == PLUS:
+            if self.is_integer(node.right, 0):
+                return node.left
+            if self.is_integer(node.left, 0):
+                return node.right
+        elif op == MINUS:
+            if self.is_integer(node.right, 0):
+                return node.left
+        elif op == MUL:
+            if self.is_integer(node.right, 1):
+                return node.left
+            if self.is_integer(node.left, 1):
+                return node.right
+        return node
+
+    def is_integer(self, node, value):
+        # an integer operand never changes the type of the other one,
+        # while x + 0.0 would turn an INTEGER x into a REAL
+        return isinstance(node, Num) and type(node.value) is int \
+            and node.value == value
@@ -1,15 +1,33 @@
 class AST(object):
-    pass
+    __slots__ = ()
+
+    @classmethod
+    def fields(cls):
+        """Names of all the slots of the node class, base classes first."""
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(getattr(klass, '__slots__', ()))
+        return names
 
 
 class BinOp(AST):
+    __slots__ = ('left', 'op', 'right', 'numeric')
+
     def __init__(self, left, op, right):
         self.left = left
-        self.token = self.op = op
+        self.op = op
         self.right = right
+        # both operands are INTEGER or REAL, set by the semantic analyzer
+        self.numeric = False
+
+    @property
+    def token(self):
+        return self.op
 
 
 class Condition(AST):
+    __slots__ = ('left', 'op_type', 'right')
+
     def __init__(self, left, op_type, right):
         self.left = left
         self.op_type = op_type
@@ -17,108 +35,217 @@ class Condition(AST):
 
 
 class IfElse(AST):
+    __slots__ = ('result', 'true_statement', 'false_statement', 'line')
+
     def __init__(self, result, true_statement, false_statement):
         self.result = result
         self.true_statement = true_statement
         self.false_statement = false_statement
+        # source line of a statement, set by the parser; statement nodes
+        # (IfElse, While, For, Assign and Call) all have it
+        self.line = None
 
 
 class While(AST):
+    __slots__ = ('result', 'statement', 'line')
+
     def __init__(self, result, statement):
         self.result = result
         self.statement = statement
+        self.line = None
 
 
 class For(AST):
+    __slots__ = ('beg', 'end', 'statement', 'counted', 'line')
+
     def __init__(self, beg, end, statement):
         self.beg = beg
         self.end = end
         self.statement = statement
+        # set by the semantic analyzer when the loop can run as a plain
+        # counted iteration: INTEGER bounds and a body that never writes
+        # the loop variable
+        self.counted = False
+        self.line = None
 
 
 class Num(AST):
+    # `value` is the decoded payload of `token`, kept in its own slot
+    # because it is read on every evaluation
+    __slots__ = ('token', 'value')
+
     def __init__(self, token):
         self.token = token
         self.value = token.value
 
 
 class String(AST):
+    __slots__ = ('token', 'value')
+
     def __init__(self, token):
         self.token = token
         self.value = token.value
 
 
 class UnaryOp(AST):
+    __slots__ = ('op', 'expr')
+
     def __init__(self, op, expr):
-        self.token = self.op = op
+        self.op = op
         self.expr = expr
 
+    @property
+    def token(self):
+        return self.op
+
 
 class Compound(AST):
+    __slots__ = ('children',)
+
     def __init__(self):
         self.children = []
 
 
 class Assign(AST):
+    __slots__ = ('left', 'op', 'right', 'line')
+
     def __init__(self, left, op, right):
         self.left = left
-        self.token = self.op = op
+        self.op = op
         self.right = right
+        self.line = None
+
+    @property
+    def token(self):
+        return self.op
 
 
 class Var(AST):
+    __slots__ = ('token', 'value', 'level', 'slot')
+
     def __init__(self, token):
         self.token = token
         self.value = token.value
+        # (scope level, slot) address resolved by the semantic analyzer
+        self.level = None
+        self.slot = None
 
 
 class NoOp(AST):
-    pass
+    __slots__ = ()
 
 
 class Program(AST):
+    __slots__ = ('name', 'block')
+
     def __init__(self, name, block):
         self.name = name
         self.block = block
 
 
 class Block(AST):
+    __slots__ = ('declarations', 'compound_statement')
+
     def __init__(self, declarations, compound_statement):
         self.declarations = declarations
         self.compound_statement = compound_statement
 
 
 class VarDecl(AST):
+    __slots__ = ('var_node', 'type_node')
+
     def __init__(self, var_node, type_node):
         self.var_node = var_node
         self.type_node = type_node
 
 
 class Type(AST):
+    __slots__ = ('token', 'value')
+
     def __init__(self, token):
         self.token = token
         self.value = token.value
 
 
+class ArrayType(AST):
+    __slots__ = ('token', 'lo', 'hi', 'type_node')
+
+    def __init__(self, token, lo, hi, type_node):
+        self.token = token
+        # the constant index bounds, both included
+        self.lo = lo
+        self.hi = hi
+        # Type node of the elements
+        self.type_node = type_node
+
+
+class Index(AST):
+    """An element of an array variable: `var[index]`."""
+    __slots__ = ('var', 'index', 'lo', 'hi')
+
+    def __init__(self, var, index):
+        self.var = var
+        self.index = index
+        # index bounds of the array, set by the semantic analyzer
+        self.lo = None
+        self.hi = None
+
+
+class ArrayVar(AST):
+    """A whole array variable as the target of an assignment, which
+    copies into the array (or fills it with a scalar) instead of
+    rebinding the variable; put in place by the semantic analyzer."""
+    __slots__ = ('var',)
+
+    def __init__(self, var):
+        self.var = var
+
+
+class ArrayOp(AST):
+    """A binary operator applied element-wise to whole arrays, or to an
+    array and a scalar; put in place of BinOp by the semantic analyzer."""
+    __slots__ = ('left', 'op', 'right')
+
+    def __init__(self, left, op, right):
+        self.left = left
+        self.op = op
+        self.right = right
+
+
 class Param(AST):
+    __slots__ = ('var_node', 'type_node')
+
     def __init__(self, var_node, type_node):
         self.var_node = var_node
         self.type_node = type_node
 
 
 class ProcedureDecl(AST):
+    __slots__ = ('proc_name', 'params', 'block_node')
+
     def __init__(self, proc_name, params, block_node):
         self.proc_name = proc_name
         self.params = params  # a list of Param nodes
         self.block_node = block_node
 
 class FunctionDecl(ProcedureDecl):
+    __slots__ = ('type_node',)
+
     def __init__(self, proc_name, params, type_node, block_node):
         super().__init__(proc_name, params, block_node)
         self.type_node=type_node
 
 class Call(AST):
+    __slots__ = ('procedure', 'params', 'tail', 'target', 'line')
+
     def __init__(self, procedure, params=None):
         self.procedure = procedure
         self.params = params
-        self.block_node = None
+        # set by the semantic analyzer on a routine's call of itself that
+        # is the last thing its body does (a tail call)
+        self.tail = False
+        # inline cache of the interpreter: the resolved callee, filled in
+        # on the first execution, see Interpreter.resolve_call
+        self.target = None
+        # None for a call in an expression
+        self.line = None
@@ -4,13 +4,30 @@ from .ast import *
 
 
 class Parser(object):
-    def __init__(self, lexer):
+    def __init__(self, lexer, stream=False, tokens=None):
         self.lexer = lexer
-        # set current token to the first token taken from the input
-        self.current_token = self.lexer.get_next_token()
+        if tokens is not None:
+            # the token stream of `lexer`, tokenized already
+            self.tokens = tokens
+            self.pos = 0
+            self.current_token = self.tokens[0]
+        elif stream:
+            # pull tokens one at a time, only the current one is kept
+            self.tokens = None
+            self.current_token = self.lexer.get_next_token()
+        else:
+            # the whole token stream, consumed by index
+            self.tokens = self.lexer.tokenize()
+            self.pos = 0
+            # set current token to the first token taken from the input
+            self.current_token = self.tokens[0]
 
     def error(self):
-        raise Exception('Invalid syntax')
+        token = self.current_token
+        raise Exception(
+            f'Invalid syntax: unexpected {token} '
+            f'at line {token.line}, column {token.column}'
+        )
 
     def eat(self, token_type):
         # compare the current token type with the passed token
@@ -18,7 +35,11 @@ class Parser(object):
         # and assign the next token to the self.current_token,
         # otherwise raise an exception.
         if self.current_token.type == token_type:
-            self.current_token = self.lexer.get_next_token()
+            if self.tokens is None:
+                self.current_token = self.lexer.get_next_token()
+            else:
+                self.pos += 1
+                self.current_token = self.tokens[self.pos]
         else:
             self.error()
 
@@ -155,8 +176,11 @@ class Parser(object):
         type_spec : INTEGER(_CONST)?
                      | REAL(_CONST)?
                      | STRING(_CONST)?
+                     | array_type
         """
         token = self.current_token
+        if self.current_token.type == ARRAY:
+            return self.array_type()
         if self.current_token.type == INTEGER:
             self.eat(INTEGER)
         elif self.current_token.type == REAL:
@@ -166,6 +190,32 @@ class Parser(object):
         node = Type(token)
         return node
 
+    def array_type(self):
+        """
+        array_type : ARRAY LBRACKET bound RANGE bound RBRACKET OF type_spec
+        """
+        token = self.current_token
+        self.eat(ARRAY)
+        self.eat(LBRACKET)
+        lo = self.bound()
+        self.eat(RANGE)
+        hi = self.bound()
+        self.eat(RBRACKET)
+        self.eat(OF)
+        return ArrayType(token, lo, hi, self.type_spec())
+
+    def bound(self):
+        """
+        bound : (MINUS)? INTEGER_CONST
+        """
+        sign = 1
+        if self.current_token.type == MINUS:
+            self.eat(MINUS)
+            sign = -1
+        value = self.current_token.value
+        self.eat(INTEGER_CONST)
+        return sign * value
+
     def compound_statement(self):
         """
         compound_statement: BEGIN statement_list END
@@ -205,6 +255,7 @@ class Parser(object):
                   | _while
                   | empty
         """
+        line = self.current_token.line
         if self.current_token.type == BEGIN:
             node = self.compound_statement()
             if self.current_token.type == SEMI:
@@ -221,6 +272,8 @@ class Parser(object):
             node = self.call()
         else:
             node = self.empty()
+        if not isinstance(node, (Compound, NoOp)):
+            node.line = line
         return node
 
     def if_else(self):
@@ -303,10 +356,14 @@ class Parser(object):
 
     def variable(self):
         """
-        variable : ID
+        variable : ID (LBRACKET expr RBRACKET)?
         """
         node = Var(self.current_token)
         self.eat(ID)
+        if self.current_token.type == LBRACKET:
+            self.eat(LBRACKET)
+            node = Index(node, self.expr())
+            self.eat(RBRACKET)
         return node
 
     def empty(self):
@@ -402,6 +459,9 @@ class Parser(object):
         type_spec : INTEGER(_CONST)?
                     | REAL(_CONST)?
                     | STRING(_CONST)?
+                    | array_type
+        array_type : ARRAY LBRACKET bound RANGE bound RBRACKET OF type_spec
+        bound : (MINUS)? INTEGER_CONST
         compound_statement : BEGIN statement_list END
         statement_list : statement
                        | statement SEMI statement_list
@@ -413,6 +473,7 @@ class Parser(object):
                 | _while
                 | empty
         assignment_statement : variable ASSIGN expr
+        variable : ID (LBRACKET expr RBRACKET)?
         if_else : IF condition THEN statement (ELSE statement)?
         _while : WHILE condition DO statement
         _for : FOR assignment_statement TO expr DO statement
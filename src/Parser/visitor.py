@@ -5,10 +5,27 @@
 ###############################################################################
 
 class NodeVisitor(object):
+    # node class -> visit method, one table per visitor class
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
     def visit(self, node):
-        method_name = 'visit_' + type(node).__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+        try:
+            visitor = self._dispatch[node.__class__]
+        except KeyError:
+            visitor = self._resolve(node.__class__)
+        return visitor(self, node)
+
+    @classmethod
+    def _resolve(cls, node_class):
+        """Look up and remember the visit method for `node_class`."""
+        visitor = getattr(
+            cls, 'visit_' + node_class.__name__, cls.generic_visit)
+        cls._dispatch[node_class] = visitor
+        return visitor
 
     def generic_visit(self, node):
         raise Exception('No visit_{} method'.format(type(node).__name__))
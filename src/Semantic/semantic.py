@@ -1,11 +1,31 @@
 import logging
+from Lexer.token_types import *
+from Parser.ast import (AST, ArrayOp, ArrayType, ArrayVar, Assign, BinOp,
+                        Call, Compound, IfElse, NoOp, Var)
 from Parser.visitor import NodeVisitor
 from Semantic import symbol
 
+
+class SemanticError(Exception):
+    """An error in the program found by SemanticAnalyzer.analyze()."""
+
+
 class SemanticAnalyzer(NodeVisitor):
+    """Builds the scopes of a program and resolves every variable to the
+    (scope level, slot) address the interpreter reads it from.
+
+    Expression visitors return the name of the expression's type
+    (INTEGER, REAL, STRING or the name of an array type), or None when
+    it is not known statically.
+    """
     def __init__(self):
         self.scopes = {}
         self.current_scope = None
+        # name -> ArrayTypeSymbol of the array types declared so far
+        self.array_types = {}
+        # function symbol -> symbols of the functions it calls, for the
+        # functions whose own statements are pure
+        self.callees = {}
 
     def visit_Block(self, node):
         for declaration in node.declarations:
@@ -25,6 +45,7 @@ class SemanticAnalyzer(NodeVisitor):
 
         # visit subtree
         self.visit(node.block)
+        self.mark_pure_functions()
 
         logging.debug(global_scope)
 
@@ -39,21 +60,203 @@ class SemanticAnalyzer(NodeVisitor):
         pass
 
     def visit_BinOp(self, node):
-        self.visit(node.left)
-        self.visit(node.right)
+        left_type = self.visit(node.left)
+        right_type = self.visit(node.right)
+        if left_type in self.array_types or right_type in self.array_types:
+            return self.array_op_type(node.op, left_type, right_type)
+        if left_type is None or right_type is None:
+            return None
+        node.numeric = left_type in (INTEGER, REAL) and \
+            right_type in (INTEGER, REAL)
+        if node.op.type == FLOAT_DIV:
+            return REAL
+        if left_type == right_type:
+            return left_type
+        if {left_type, right_type} == {INTEGER, REAL}:
+            return REAL
+        return None
+
+    def array_op_type(self, op, left_type, right_type):
+        """Return the array type of `op` applied element-wise to operands
+        of `left_type` and `right_type`, at least one of them an array."""
+        bounds = set()
+        element_types = set()
+        for operand_type in (left_type, right_type):
+            array_type = self.array_types.get(operand_type)
+            if array_type is not None:
+                bounds.add((array_type.lo, array_type.hi))
+                element_types.add(array_type.element_type)
+            elif operand_type in (INTEGER, REAL):
+                element_types.add(operand_type)
+            else:
+                raise Exception(
+                    f'Error: Can\'t apply {op.value} to {left_type} '
+                    f'and {right_type}'
+                )
+        if len(bounds) > 1:
+            raise Exception(
+                f'Error: Can\'t apply {op.value} to {left_type} '
+                f'and {right_type}'
+            )
+        lo, hi = bounds.pop()
+        if op.type == FLOAT_DIV or REAL in element_types:
+            return self.array_type(REAL, lo, hi).name
+        return self.array_type(INTEGER, lo, hi).name
+
+    def array_type(self, element_type, lo, hi):
+        """Return the ArrayTypeSymbol of the given element type and
+        bounds, the same one for every declaration."""
+        name = f'ARRAY[{lo}..{hi}] OF {element_type}'
+        array_type = self.array_types.get(name)
+        if array_type is None:
+            array_type = symbol.ArrayTypeSymbol(element_type, lo, hi)
+            self.array_types[name] = array_type
+        return array_type
+
+    def scalar(self, value_type):
+        """Signal an error if `value_type` is an array type."""
+        if value_type in self.array_types:
+            raise Exception(f'Error: {value_type} is not a scalar type')
+        return value_type
+
+    def visit_Condition(self, node):
+        self.scalar(self.visit(node.left))
+        self.scalar(self.visit(node.right))
 
     def visit_IfElse(self, node):
-        pass
+        self.visit(node.result)
+        self.visit(node.true_statement)
+        self.visit(node.false_statement)
 
     def visit_While(self, node):
-        pass
+        self.visit(node.result)
+        self.visit(node.statement)
 
     def visit_For(self, node):
-        pass
+        if not isinstance(node.beg.left, Var):
+            raise Exception('Error: The FOR loop variable must be a variable')
+        self.visit(node.beg)
+        var_type = self.visit(node.beg.left)
+        end_type = self.scalar(self.visit(node.end))
+        self.visit(node.statement)
+        node.counted = var_type == INTEGER and end_type == INTEGER and \
+            not self.may_write(node.statement, node.beg.left)
+
+    def mark_tail_calls(self, statement, proc_symbol):
+        """Mark the calls of `proc_symbol` in tail position of its body.
+
+        A statement is in tail position if it is the last one of the
+        body, looking through compound statements and both branches of
+        IF. The tail call of a procedure is a call statement, the one of
+        a function is an assignment of the call to the function result.
+        """
+        stack = [statement]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Compound):
+                children = [c for c in node.children
+                            if not isinstance(c, NoOp)]
+                if children:
+                    stack.append(children[-1])
+            elif isinstance(node, IfElse):
+                stack.append(node.true_statement)
+                stack.append(node.false_statement)
+            elif isinstance(node, Assign):
+                if proc_symbol.type is not None and \
+                        isinstance(node.left, Var) and node.left.slot == 0 \
+                        and node.left.level == proc_symbol.scope_level + 1:
+                    self.mark_tail_call(node.right, proc_symbol)
+            elif proc_symbol.type is None:
+                self.mark_tail_call(node, proc_symbol)
+
+    def mark_tail_call(self, node, proc_symbol):
+        if isinstance(node, Call) and node.procedure == proc_symbol.name \
+                and self.current_scope.lookup(node.procedure) is proc_symbol:
+            node.tail = True
+
+    def collect_callees(self, statement, proc_symbol):
+        """Record the functions called by the function `proc_symbol` if
+        its statements only touch its own parameters, locals and result.
 
-    def visit_ProcedureDecl(self, node):
+        Any variable of an enclosing scope, WRITELN, READLN or a call of a
+        procedure makes the function impure.
+        """
+        level = self.current_scope.scope_level
+        callees = set()
+        stack = [statement]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, AST):
+                continue
+            if isinstance(node, Var):
+                if node.level != level:
+                    return
+            elif isinstance(node, Call):
+                if node.procedure not in self.scopes:
+                    return
+                callee = self.current_scope.lookup(node.procedure)
+                if callee.type is None:
+                    return
+                callees.add(callee)
+            for field in node.fields():
+                stack.append(getattr(node, field))
+        self.callees[proc_symbol] = callees
+
+    def mark_pure_functions(self):
+        """Mark the functions that are pure: their statements are, and
+        so are all the functions they call, recursion included."""
+        pure = set(self.callees)
+        changed = True
+        while changed:
+            changed = False
+            for proc_symbol in list(pure):
+                if not self.callees[proc_symbol] <= pure:
+                    pure.discard(proc_symbol)
+                    changed = True
+        for proc_symbol in pure:
+            proc_symbol.pure = True
+
+    def may_write(self, statement, var):
+        """Return True unless `statement` provably leaves `var` alone.
+
+        Direct assignments, nested FOR loops over `var` and READLN(var)
+        write it; so may any call of a routine declared at the level of
+        `var` or deeper, since only those routines can see it.
+        """
+        stack = [statement]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, AST):
+                continue
+            if isinstance(node, Assign):
+                target = node.left
+                # elements and whole arrays are never loop variables
+                if isinstance(target, Var) and \
+                        (target.level, target.slot) == (var.level, var.slot):
+                    return True
+            elif isinstance(node, Call):
+                if node.procedure in self.scopes:
+                    proc_symbol = self.current_scope.lookup(node.procedure)
+                    if proc_symbol.scope_level >= var.level:
+                        return True
+                elif node.procedure == 'READLN':
+                    for param in node.params:
+                        if (param.level, param.slot) == (var.level, var.slot):
+                            return True
+            for field in node.fields():
+                stack.append(getattr(node, field))
+        return False
+
+    def visit_ProcedureDecl(self, node, return_type=None):
         proc_name = node.proc_name
         proc_symbol = symbol.ProcedureSymbol(proc_name)
+        proc_symbol.type = return_type
         self.current_scope.insert(proc_symbol)
 
         logging.debug(' ENTER scope: %s' % proc_name)
@@ -68,6 +271,11 @@ class SemanticAnalyzer(NodeVisitor):
 
         # Insert parameters into the procedure scope
         for param in node.params:
+            if isinstance(param.type_node, ArrayType):
+                raise Exception(
+                    f'Error: ARRAY parameter \'{param.var_node.value}\' of '
+                    f'\'{proc_name}\' is not supported'
+                )
             param_type = self.current_scope.lookup(param.type_node.value)
             param_name = param.var_node.value
             var_symbol = symbol.VarSymbol(param_name, param_type)
@@ -75,6 +283,10 @@ class SemanticAnalyzer(NodeVisitor):
             proc_symbol.params.append(var_symbol)
 
         self.visit(node.block_node)
+        self.mark_tail_calls(node.block_node.compound_statement, proc_symbol)
+        if return_type is not None:
+            self.collect_callees(node.block_node.compound_statement,
+                                 proc_symbol)
 
         logging.debug(procedure_scope)
 
@@ -82,11 +294,19 @@ class SemanticAnalyzer(NodeVisitor):
         logging.debug(' LEAVE scope: %s' % proc_name)
 
     def visit_FunctionDecl(self, node):
-        self.visit_ProcedureDecl(node)
+        if isinstance(node.type_node, ArrayType):
+            raise Exception(
+                f'Error: ARRAY result of \'{node.proc_name}\' is not supported'
+            )
+        return_type = self.current_scope.lookup(node.type_node.value)
+        self.visit_ProcedureDecl(node, return_type)
 
     def visit_VarDecl(self, node):
-        type_name = node.type_node.value
-        type_symbol = self.current_scope.lookup(type_name)
+        if isinstance(node.type_node, ArrayType):
+            type_symbol = self.visit(node.type_node)
+        else:
+            type_name = node.type_node.value
+            type_symbol = self.current_scope.lookup(type_name)
 
         # We have all the information we need to create a variable symbol.
         # Create the symbol and insert it into the symbol table.
@@ -101,19 +321,93 @@ class SemanticAnalyzer(NodeVisitor):
             )
 
         self.current_scope.insert(var_symbol)
+        # the interpreters allocate the storage of arrays here
+        node.var_node.level = var_symbol.scope_level
+        node.var_node.slot = var_symbol.slot
+
+    def visit_ArrayType(self, node):
+        element_type = node.type_node.value
+        if element_type not in (INTEGER, REAL):
+            raise Exception(
+                f'Error: ARRAY OF {element_type} is not supported'
+            )
+        if node.lo > node.hi:
+            raise Exception(
+                f'Error: Invalid ARRAY bounds {node.lo}..{node.hi}'
+            )
+        return self.array_type(element_type, node.lo, node.hi)
+
+    def visit_Index(self, node):
+        array_type = self.array_types.get(self.visit(node.var))
+        if array_type is None:
+            raise Exception(
+                f'Error: \'{node.var.value}\' is not an array'
+            )
+        index_type = self.visit(node.index)
+        if index_type not in (INTEGER, None):
+            raise Exception(f'Error: Can\'t index an array with {index_type}')
+        node.lo = array_type.lo
+        node.hi = array_type.hi
+        return array_type.element_type
 
     def visit_Assign(self, node):
-        # self.visit(node.right)
-        # self.visit(node.left)
         # right-hand side
-        value_type = self.visit(node.right).type
+        value_type = self.visit(node.right)
         # left-hand side
-        var_type = self.visit(node.left).type.__str__()
-        if value_type.replace('_CONST', '') != var_type:
+        var_type = self.visit(node.left)
+        array_type = self.array_types.get(var_type)
+        if array_type is not None:
+            self.check_array_assign(array_type, value_type)
+            # the assignment copies into the array, element-wise
+            node.left = ArrayVar(node.left)
+            node.right = self.vectorize(node.right)
+            return
+        self.scalar(value_type)
+        if value_type is None or var_type is None:
+            return
+        if value_type != var_type and (value_type, var_type) != (INTEGER, REAL):
             raise Exception(
                 f'Error: Can\'t assign {value_type} to {var_type}'
             )
 
+    def check_array_assign(self, array_type, value_type):
+        """Signal an error unless a value of `value_type` can be assigned
+        to an array of `array_type`: an array of the same bounds, or a
+        scalar every element is set to."""
+        value_array = self.array_types.get(value_type)
+        if value_array is not None:
+            if (value_array.lo, value_array.hi) != \
+                    (array_type.lo, array_type.hi):
+                value_type = value_array.name
+            else:
+                value_type = value_array.element_type
+        if value_type is None:
+            return
+        if value_type != array_type.element_type and \
+                (value_type, array_type.element_type) != (INTEGER, REAL):
+            raise Exception(
+                f'Error: Can\'t assign {value_type} to {array_type}'
+            )
+
+    def vectorize(self, node):
+        """Return the expression `node` with every operator on arrays
+        replaced by an ArrayOp, which applies it to all elements at once."""
+        if not isinstance(node, BinOp):
+            return node
+        left = self.vectorize(node.left)
+        right = self.vectorize(node.right)
+        if self.is_array(left) or self.is_array(right):
+            return ArrayOp(left, node.op, right)
+        return node
+
+    def is_array(self, node):
+        if isinstance(node, ArrayOp):
+            return True
+        if isinstance(node, Var):
+            var_symbol = self.current_scope.lookup(node.value)
+            return isinstance(var_symbol.type, symbol.ArrayTypeSymbol)
+        return False
+
     def visit_Var(self, node):
         var_name = node.value
         var_symbol = self.current_scope.lookup(var_name)
@@ -121,16 +415,39 @@ class SemanticAnalyzer(NodeVisitor):
             raise Exception(
                 "Error: Symbol(identifier) not found '%s'" % var_name
             )
-        return var_symbol
+        func_scope = self.result_scope(var_symbol)
+        if func_scope is not None:
+            # the name of an enclosing function denotes its result
+            node.level = func_scope.scope_level
+            node.slot = 0
+        else:
+            node.level = var_symbol.scope_level
+            node.slot = var_symbol.slot
+        if var_symbol.type is None:
+            return None
+        return var_symbol.type.name
+
+    def result_scope(self, proc_symbol):
+        """Return the scope of `proc_symbol` if it is a function whose body
+        is being analyzed, else None."""
+        if not isinstance(proc_symbol, symbol.ProcedureSymbol):
+            return None
+        scope = self.current_scope
+        while scope is not None:
+            if scope.scope_name == proc_symbol.name and \
+                    scope.scope_level == proc_symbol.scope_level + 1:
+                return scope
+            scope = scope.enclosing_scope
+        return None
 
     def visit_Num(self, node):
-        return node.token
+        return node.token.type.replace('_CONST', '')
 
     def visit_String(self, node):
-        return node.token
+        return STRING
 
     def visit_UnaryOp(self, node):
-        pass
+        return self.scalar(self.visit(node.expr))
 
     def visit_Call(self, node):
         call_name = node.procedure
@@ -139,28 +456,34 @@ class SemanticAnalyzer(NodeVisitor):
             raise Exception(
                 "Error: Symbol(identifier) not found '%s'" % call_name
             )
-        for param, f in zip(node.params, proc_symbol.params):
-            if hasattr(param, 'token') and param.token.type != "ID":
+        param_types = [self.scalar(self.visit(param))
+                       for param in node.params]
+        if call_name == 'READLN' and call_name not in self.scopes:
+            for param in node.params:
+                if not isinstance(param, Var):
+                    raise Exception(
+                        'Error: READLN reads into variables only'
+                    )
+        for param, param_type, f in zip(
+                node.params, param_types, proc_symbol.params):
+            # only variables are checked against the formal parameters
+            if not isinstance(param, Var):
                 continue
-            if hasattr(param, 'value') is False:
-                continue
-            param_symbol = self.current_scope.lookup(param.value)
-            if param_symbol is None:
-                raise Exception(
-                    "Error: Symbol(identifier) not found '%s'" % param.value
-                )
-            if f.type is None:
+            if f.type is None or param_type is None:
                 continue
-            param_type = param_symbol.type
-            if param_type != f.type:
+            if param_type != f.type.name:
                 raise Exception(
                 f'Error: Can\'t assign {param_type} to {f.type}'
             )
+        if proc_symbol.type is None:
+            return None
+        return proc_symbol.type.name
 
     def analyze(self, tree):
         try:
             self.visit(tree)
+        except SemanticError:
+            raise
         except Exception as e:
-            print(e)
-            exit(1)
+            raise SemanticError(str(e)) from e
         return self.scopes
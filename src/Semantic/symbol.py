@@ -4,6 +4,10 @@ class Symbol(object):
     def __init__(self, name, type=None):
         self.name = name
         self.type = type
+        # address of the symbol's value: the level of the declaring scope
+        # and the index into the slot list of that scope's frames
+        self.scope_level = None
+        self.slot = None
 
 
 class VarSymbol(Symbol):
@@ -34,11 +38,36 @@ class BuiltinTypeSymbol(Symbol):
         )
 
 
+class ArrayTypeSymbol(Symbol):
+    """The type ARRAY[lo..hi] OF element_type, named after its spelling
+    so that two declarations of the same bounds and element type denote
+    the same type."""
+
+    def __init__(self, element_type, lo, hi):
+        super().__init__(f'ARRAY[{lo}..{hi}] OF {element_type}')
+        # the name of the element type, INTEGER or REAL
+        self.element_type = element_type
+        self.lo = lo
+        self.hi = hi
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return "<{class_name}(name='{name}')>".format(
+            class_name=self.__class__.__name__,
+            name=self.name,
+        )
+
+
 class ProcedureSymbol(Symbol):
     def __init__(self, name, params=None):
         super().__init__(name)
         # a list of formal parameters
         self.params = params if params is not None else []
+        # a function whose result only depends on its arguments and that
+        # has no side effects, see SemanticAnalyzer.mark_pure_functions
+        self.pure = False
 
     def __str__(self):
         return '<{class_name}(name={name}, parameters={params})>'.format(
@@ -56,6 +85,9 @@ class ScopedSymbolTable(object):
         self.scope_name = scope_name
         self.scope_level = scope_level
         self.enclosing_scope = enclosing_scope
+        # number of value slots a frame of this scope needs;
+        # slot 0 holds the result of a function
+        self.slot_count = 1
 
     def _init_builtins(self):
         self.insert(BuiltinTypeSymbol('INTEGER'))
@@ -90,6 +122,10 @@ class ScopedSymbolTable(object):
 
     def insert(self, symbol):
         logging.debug(' Insert: %s' % symbol.name)
+        symbol.scope_level = self.scope_level
+        if not isinstance(symbol, BuiltinTypeSymbol):
+            symbol.slot = self.slot_count
+            self.slot_count += 1
         self._symbols[symbol.name] = symbol
 
     def lookup(self, name, current_scope_only=False):
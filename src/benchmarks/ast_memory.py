@@ -0,0 +1,110 @@
+"""Bytes per AST node, slotted nodes against the old __dict__ layout.
+
+Usage (from src/):
+    python -m benchmarks.ast_memory [program.pas]
+
+Without a program a large generated one is used. The "before" figures
+come from copies of every node into plain classes carrying a __dict__
+and the duplicated `token` attribute the old nodes had.
+"""
+import sys
+import tracemalloc
+from collections import Counter
+from Lexer.scanner import Scanner
+from Parser import ast
+from Parser.myparser import Parser
+
+
+def generate_program(statements=20000, variables=50):
+    decl = '\n'.join(f'   x{i} : INTEGER;' for i in range(variables))
+    body = '\n'.join(
+        f'   x{i % variables} := x{(i + 1) % variables} * 3 + {i} DIV 2;'
+        f' WRITELN(x{i % variables});'
+        for i in range(statements)
+    )
+    return f'PROGRAM Generated;\nVAR\n{decl}\nBEGIN\n{body}\nEND.\n'
+
+
+def walk(node):
+    """Generate `node` and every AST node below it."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        for name in type(node).fields():
+            value = getattr(node, name)
+            if isinstance(value, ast.AST):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(v for v in value if isinstance(v, ast.AST))
+
+
+# the attributes the old node classes set on top of their fields
+LEGACY_ALIASES = {
+    ast.BinOp: ('token',),
+    ast.UnaryOp: ('token',),
+    ast.Assign: ('token',),
+    ast.Call: ('block_node',),
+}
+LEGACY_CLASSES = {}
+
+
+def legacy_class(cls):
+    legacy_cls = LEGACY_CLASSES.get(cls)
+    if legacy_cls is None:
+        legacy_cls = LEGACY_CLASSES[cls] = type(cls.__name__, (object,), {})
+    return legacy_cls
+
+
+def legacy_copy(node):
+    cls = type(node)
+    copy = legacy_class(cls)()
+    for name in cls.fields():
+        setattr(copy, name, getattr(node, name))
+    for name in LEGACY_ALIASES.get(cls, ()):
+        setattr(copy, name, getattr(node, name, None))
+    return copy
+
+
+def slotted_copy(node):
+    cls = type(node)
+    copy = cls.__new__(cls)
+    for name in cls.fields():
+        setattr(copy, name, getattr(node, name))
+    return copy
+
+
+def bytes_per_node(nodes, copy):
+    copies = [None] * len(nodes)
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    for i, node in enumerate(nodes):
+        copies[i] = copy(node)
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return size / len(nodes)
+
+
+def main():
+    if len(sys.argv) > 1:
+        text = open(sys.argv[1], 'r').read()
+    else:
+        text = generate_program()
+    tree = Parser(Scanner(text)).parse()
+    nodes = list(walk(tree))
+    # create the legacy classes outside of the measured region
+    for cls in set(map(type, nodes)):
+        legacy_class(cls)
+
+    print(f'{len(nodes)} nodes')
+    for name, count in Counter(type(n).__name__ for n in nodes).most_common():
+        print(f'  {name:<14}{count:>8}')
+    before = bytes_per_node(nodes, legacy_copy)
+    after = bytes_per_node(nodes, slotted_copy)
+    print(f'__dict__ nodes: {before:8.1f} bytes/node')
+    print(f'slotted nodes:  {after:8.1f} bytes/node')
+    print(f'saved:          {1 - after / before:8.1%}')
+
+
+if __name__ == '__main__':
+    main()
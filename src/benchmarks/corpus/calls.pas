@@ -0,0 +1,42 @@
+PROGRAM Calls;
+{ many calls of small procedures and functions }
+VAR
+   i, total : INTEGER;
+
+FUNCTION Square(k : INTEGER) : INTEGER;
+BEGIN
+   Square := k * k
+END;
+
+FUNCTION Max(a, b : INTEGER) : INTEGER;
+BEGIN
+   IF a > b THEN
+      Max := a
+   ELSE
+      Max := b
+END;
+
+FUNCTION Clamp(k, lo, hi : INTEGER) : INTEGER;
+BEGIN
+   Clamp := Max(lo, hi - Max(0, hi - k))
+END;
+
+PROCEDURE Add(k : INTEGER);
+BEGIN
+   total := total + k
+END;
+
+PROCEDURE Nop;
+BEGIN
+END;
+
+BEGIN
+   total := 0;
+   FOR i := 1 TO 20000 DO
+   BEGIN
+      Add(Square(i - i DIV 100 * 100));
+      Add(Clamp(i, 10, 1000));
+      Nop()
+   END;;
+   WRITELN(total)
+END.
@@ -0,0 +1,27 @@
+PROGRAM Loops;
+{ tight arithmetic in FOR and WHILE loops }
+VAR
+   i, j, sum, n : INTEGER;
+   x : REAL;
+
+BEGIN
+   sum := 0;
+   FOR i := 1 TO 200 DO
+      FOR j := 1 TO 500 DO
+         sum := sum + i * j - (i + j) DIV 3;
+   WRITELN(sum);
+
+   n := 0;
+   i := 100000;
+   WHILE i > 0 DO
+   BEGIN
+      n := n + i DIV 7;
+      i := i - 1
+   END;;
+   WRITELN(n);
+
+   x := 0.0;
+   FOR i := 1 TO 50000 DO
+      x := x + i / 3;
+   WRITELN(x)
+END.
@@ -0,0 +1,13 @@
+PROGRAM Output;
+{ heavy WRITELN output }
+VAR
+   i : INTEGER;
+
+BEGIN
+   FOR i := 1 TO 50000 DO
+   BEGIN
+      WRITELN(i);
+      WRITELN('line')
+   END;;
+   WRITELN(i / 7)
+END.
@@ -0,0 +1,37 @@
+PROGRAM Recursion;
+{ deep and branching recursion }
+VAR
+   n : INTEGER;
+
+FUNCTION Sum(k : INTEGER) : INTEGER;
+BEGIN
+   IF k = 0 THEN
+      Sum := 0
+   ELSE
+      Sum := k + Sum(k - 1)
+END;
+
+FUNCTION Fib(k : INTEGER) : INTEGER;
+BEGIN
+   IF k < 2 THEN
+      Fib := k
+   ELSE
+      Fib := Fib(k - 1) + Fib(k - 2)
+END;
+
+PROCEDURE Countdown(k : INTEGER);
+BEGIN
+   IF k > 0 THEN
+   BEGIN
+      n := n + 1;
+      Countdown(k - 1)
+   END
+END;
+
+BEGIN
+   WRITELN(Sum(5000));
+   WRITELN(Fib(18));
+   n := 0;
+   Countdown(20000);
+   WRITELN(n)
+END.
@@ -0,0 +1,16 @@
+PROGRAM Strings;
+{ building strings by concatenation }
+VAR
+   i, j : INTEGER;
+   s, line : STRING;
+
+BEGIN
+   FOR i := 1 TO 1000 DO
+   BEGIN
+      line := '';
+      FOR j := 1 TO 100 DO
+         line := line + 'ab';
+      s := line + '|' + line;
+      WRITELN(s)
+   END;
+END.
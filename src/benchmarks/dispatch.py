@@ -0,0 +1,82 @@
+"""Micro-benchmark of NodeVisitor.visit dispatch.
+
+Usage (from src/):
+    python -m benchmarks.dispatch [repeat]
+
+Runs a test.pas-style program, a FOR loop calling a procedure and a
+recursive function, with the cached per-class dispatch table and with
+the old `getattr(self, 'visit_' + name)` lookup on every visit.
+"""
+import contextlib
+import io
+import sys
+import time
+from Interpreter.interpreter import Interpreter
+
+PROGRAM = '''
+PROGRAM Dispatch;
+VAR
+   a, i, r : INTEGER;
+   s : STRING;
+
+PROCEDURE P1(s : STRING);
+VAR
+   i : INTEGER;
+BEGIN
+   FOR i := a TO 3 DO
+      BEGIN
+         r := r + 1;
+      END;
+END;
+
+FUNCTION P2(a : INTEGER) : INTEGER;
+BEGIN
+   IF a > 1 THEN
+      P2 := a * P2(a - 1)
+   ELSE
+      P2 := 1
+END;
+
+BEGIN
+   a := 1;
+   r := 1;
+   s := 'Hello World';
+   FOR i := 1 TO 20000 DO
+      BEGIN
+         P1(s);
+         r := r + P2(5) DIV 2 - i * 3;
+      END;;
+   WRITELN(r);
+END.
+'''
+
+
+class GetattrInterpreter(Interpreter):
+    def visit(self, node):
+        method_name = 'visit_' + type(node).__name__
+        visitor = getattr(self, method_name, self.generic_visit)
+        return visitor(node)
+
+
+def best_of(interpreter_class, repeat):
+    interpreter = interpreter_class(PROGRAM)
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            interpreter.interpret()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    before = best_of(GetattrInterpreter, repeat)
+    after = best_of(Interpreter, repeat)
+    print(f'getattr dispatch: {before:8.3f} s')
+    print(f'cached dispatch:  {after:8.3f} s')
+    print(f'speedup:          {before / after:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
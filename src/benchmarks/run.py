@@ -0,0 +1,265 @@
+"""Benchmark runner over the programs of benchmarks/corpus.
+
+Usage (from src/):
+    python -m benchmarks.run [--engine ENGINE] [--repeat N] [NAME ...]
+    python -m benchmarks.run --save       # store the baseline
+    python -m benchmarks.run --check      # compare with the baseline
+
+Every program is compiled and run `repeat` times; each run records the
+phases of Interpreter metrics (lex, parse, analyze, optimize, codegen,
+execute) and the table shows the median wall time of every phase with
+its spread, (max - min) / median. Besides the corpus, "generated" is a
+large generated source, for lexer and parser throughput.
+
+The output of every run must match the SHA-256 digest stored for the
+program in corpus/expected.json, or the runner fails with exit status
+1: a fast but wrong engine does not pass. --save-expected stores the
+digests of the tree engine's output, after a corpus program is added.
+
+--save writes the medians to the baseline JSON; --check fails, with
+exit status 1, when a phase's median is more than `threshold` slower
+than in the baseline. Phases shorter than --min-time in the baseline
+are too noisy to compare and are skipped. Timings depend on the
+machine, so the baseline is not committed (see .gitignore).
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+from Interpreter.bytecode import BytecodeCompiler
+from Interpreter.closures import ClosureCompiler
+from Interpreter.input import Input
+from Interpreter.interpreter import Interpreter
+from Interpreter.metrics import Metrics
+from Interpreter.output import MemorySink, Output
+from Interpreter.recursion import run_deep
+from Interpreter.translator import compile_program, run_program
+from Interpreter.vm import VM
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'corpus')
+EXPECTED = os.path.join(CORPUS, 'expected.json')
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+ENGINES = ('tree', 'closure', 'python', 'vm')
+
+
+def generate_program(statements=20000, variables=50):
+    """Return a large straight-line program, mostly lexed and parsed,
+    and its output."""
+    decl = '\n'.join(f'   x{i} : INTEGER;' for i in range(variables))
+    init = '\n'.join(f'   x{i} := {i};' for i in range(variables))
+    body = '\n'.join(
+        f'   x{i % variables} := (x{(i + 1) % variables} + {i}) DIV 2;'
+        for i in range(statements)
+    )
+    # what the program computes
+    x = list(range(variables))
+    for i in range(statements):
+        x[i % variables] = (x[(i + 1) % variables] + i) // 2
+    return (f'PROGRAM Generated;\nVAR\n{decl}\nBEGIN\n{init}\n{body}\n'
+            f'   WRITELN(x0)\nEND.\n', f'{x[0]}\n')
+
+
+def digest(output):
+    return hashlib.sha256(output.encode()).hexdigest()
+
+
+def load_programs(names=None):
+    """Return {name: source} of the corpus and the generated program,
+    and {name: digest of the expected output}."""
+    programs = {}
+    for file_name in sorted(os.listdir(CORPUS)):
+        name, extension = os.path.splitext(file_name)
+        if extension == '.pas':
+            with open(os.path.join(CORPUS, file_name)) as f:
+                programs[name] = f.read()
+    expected = {}
+    if os.path.exists(EXPECTED):
+        with open(EXPECTED) as f:
+            expected = json.load(f)
+    programs['generated'], output = generate_program()
+    expected['generated'] = digest(output)
+    if names:
+        unknown = set(names) - set(programs)
+        if unknown:
+            raise SystemExit(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+        programs = {name: programs[name] for name in names}
+    return programs, expected
+
+
+def run_once(source, engine):
+    """Compile and run `source` once, return {phase: wall time} and
+    the output."""
+    metrics = Metrics(trace_memory=False)
+    sink = MemorySink()
+    output = Output(sink)
+    reader = Input(())
+    interpreter = Interpreter(
+        source, metrics=metrics, output=output, input=reader)
+    if engine == 'tree':
+        run_deep(interpreter.interpret)
+    elif engine == 'closure':
+        with interpreter.phase('codegen'):
+            program = ClosureCompiler(
+                interpreter.scopes, output, reader).compile(interpreter.tree)
+        with interpreter.phase('execute'):
+            run_deep(program)
+    elif engine == 'python':
+        with interpreter.phase('codegen'):
+            _, code = compile_program(interpreter.tree, interpreter.scopes)
+        with interpreter.phase('execute'):
+            run_deep(run_program, code, output, reader)
+    else:
+        with interpreter.phase('codegen'):
+            program = BytecodeCompiler(interpreter.scopes).compile(
+                interpreter.tree)
+        with interpreter.phase('execute'):
+            VM(program, output, reader).run()
+    times = {name: phase.wall_time for name, phase in metrics.phases.items()}
+    return times, sink.getvalue()
+
+
+def summarize(samples):
+    median = statistics.median(samples)
+    return {
+        'median': median,
+        'min': min(samples),
+        'max': max(samples),
+        'spread': (max(samples) - min(samples)) / median if median else 0.0,
+    }
+
+
+def benchmark(source, engine, repeat):
+    """Return {phase: summary} of `repeat` runs of `source`, and the
+    set of digests of their outputs."""
+    runs = []
+    outputs = set()
+    for _ in range(repeat):
+        times, output = run_once(source, engine)
+        runs.append(times)
+        outputs.add(digest(output))
+    return {phase: summarize([run[phase] for run in runs])
+            for phase in runs[0]}, outputs
+
+
+def report(results):
+    lines = [f'{"benchmark":<12} {"phase":<10} {"median ms":>11} '
+             f'{"min ms":>10} {"max ms":>10} {"spread":>8}']
+    for name, phases in results.items():
+        for phase, summary in phases.items():
+            lines.append(
+                f'{name:<12} {phase:<10} {summary["median"] * 1000:>11.3f} '
+                f'{summary["min"] * 1000:>10.3f} '
+                f'{summary["max"] * 1000:>10.3f} '
+                f'{summary["spread"] * 100:>7.1f}%')
+    return '\n'.join(lines)
+
+
+def regressions(results, baseline, threshold, min_time):
+    """Return a line for every phase slower than in `baseline` by more
+    than `threshold`."""
+    found = []
+    for name, phases in results.items():
+        for phase, summary in phases.items():
+            base = baseline.get(name, {}).get(phase)
+            if base is None or base['median'] < min_time:
+                continue
+            ratio = summary['median'] / base['median']
+            if ratio > 1 + threshold:
+                found.append(
+                    f'{name} {phase}: {base["median"] * 1000:.3f} ms -> '
+                    f'{summary["median"] * 1000:.3f} ms (+{(ratio - 1) * 100:.1f}%)')
+    return found
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Run the benchmark corpus')
+    arg_parser.add_argument(
+        'names', nargs='*', metavar='NAME',
+        help='benchmarks to run (default: all)')
+    arg_parser.add_argument(
+        '--engine', choices=ENGINES, default='tree',
+        help='execution engine (default: tree)')
+    arg_parser.add_argument(
+        '--repeat', type=int, default=5, metavar='N',
+        help='runs per benchmark (default: 5)')
+    arg_parser.add_argument(
+        '--baseline', default=BASELINE, metavar='FILE',
+        help='baseline JSON file (default: benchmarks/baseline.json)')
+    arg_parser.add_argument(
+        '--save', action='store_true',
+        help='store the results as the baseline')
+    arg_parser.add_argument(
+        '--check', action='store_true',
+        help='fail if a phase regressed against the baseline')
+    arg_parser.add_argument(
+        '--threshold', type=float, default=0.10,
+        help='slowdown of a median that counts as a regression '
+             '(default: 0.10)')
+    arg_parser.add_argument(
+        '--min-time', type=float, default=1.0, metavar='MS',
+        help='phases faster than this in the baseline are not checked '
+             '(default: 1.0)')
+    arg_parser.add_argument(
+        '--save-expected', action='store_true',
+        help='store the digests of the outputs as the expected ones '
+             '(tree engine only)')
+    args = arg_parser.parse_args()
+    if args.save_expected and args.engine != 'tree':
+        arg_parser.error('--save-expected is only supported by the tree '
+                         'engine')
+
+    programs, expected = load_programs(args.names)
+    results = {}
+    wrong = []
+    for name, source in programs.items():
+        results[name], outputs = benchmark(source, args.engine, args.repeat)
+        print(f'{name}: done', file=sys.stderr)
+        if args.save_expected and name != 'generated':
+            if len(outputs) == 1:
+                expected[name] = outputs.pop()
+                continue
+        if outputs != {expected.get(name)}:
+            wrong.append(name)
+    print(report(results))
+
+    if args.save_expected:
+        expected.pop('generated')
+        with open(EXPECTED, 'w') as f:
+            json.dump(expected, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'expected outputs written to {EXPECTED}')
+    if wrong:
+        print(f'\nwrong output: {", ".join(wrong)}, see {EXPECTED}')
+        sys.exit(1)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'engine': args.engine, 'repeat': args.repeat,
+                       'results': results}, f, indent=2)
+            f.write('\n')
+        print(f'baseline written to {args.baseline}')
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            raise SystemExit(f'no baseline at {args.baseline}, '
+                             'run with --save first')
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['engine'] != args.engine:
+            raise SystemExit(f'the baseline is of the {baseline["engine"]} '
+                             f'engine, not {args.engine}')
+        found = regressions(results, baseline['results'], args.threshold,
+                            args.min_time / 1000)
+        if found:
+            print(f'\n{len(found)} regression(s) over '
+                  f'{args.threshold * 100:g}%:')
+            print('\n'.join(found))
+            sys.exit(1)
+        print('\nno regressions')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,260 @@
+import argparse
 import logging
+import os
+import sys
+from Interpreter.bytecode import BytecodeCompiler, disassemble
+from Interpreter.cache import ProgramCache
+from Interpreter.closures import ClosureCompiler
+from Interpreter.input import BLOCK_SIZE, Input, read_blocks
 from Interpreter.interpreter import Interpreter
+from Interpreter.memo import MEMO_SIZE
+from Interpreter.metered import MeteredInterpreter
+from Interpreter.metrics import Metrics
+from Interpreter.output import (
+    BUFFER_SIZE, FLUSH_POLICIES, FileSink, Output, StdoutSink)
+from Interpreter.profiler import ProfilingInterpreter
+from Interpreter.recursion import run_deep
+from Interpreter.sampler import (
+    SAMPLE_INTERVAL, SampledInterpreter, SamplingProfiler)
+from Interpreter.tiering import TIER_THRESHOLD, TieredInterpreter
+from Interpreter.translator import compile_program, run_program
+from Interpreter.vm import VM
+from Lexer.lexer import Lexer
+from Lexer.scanner import Scanner
+from Semantic.semantic import SemanticError
+
+LEXERS = {
+    'scanner': Scanner,
+    'legacy': Lexer,
+}
+
 
 def main():
-    import sys
+    arg_parser = argparse.ArgumentParser(
+        description='Simple Pascal Interpreter')
+    arg_parser.add_argument('inputfile', help='Pascal source file')
+    arg_parser.add_argument(
+        '--lexer', choices=LEXERS, default='scanner',
+        help='tokenizer implementation (default: scanner)')
+    arg_parser.add_argument(
+        '--engine', choices=('tree', 'closure', 'python', 'vm'),
+        default='tree',
+        help='execution engine: walk the AST, compile it to closures, '
+             'translate it to Python or compile it to bytecode for the '
+             'stack VM (default: tree)')
+    arg_parser.add_argument(
+        '--emit-python', metavar='FILE',
+        help='write the program translated to a Python module to FILE')
+    arg_parser.add_argument(
+        '--disassemble', action='store_true',
+        help='print the bytecode listing of the program and exit')
+    arg_parser.add_argument(
+        '-O', dest='optimize', type=int, choices=(0, 1, 2), default=0,
+        help='optimization level: 1 folds constants and removes dead '
+             'branches, 2 also simplifies arithmetic identities '
+             '(default: 0)')
+    arg_parser.add_argument(
+        '--memoize', action='store_true',
+        help='cache the results of pure functions (tree engine only)')
+    arg_parser.add_argument(
+        '--memoize-only', metavar='NAMES',
+        help='like --memoize, for the comma separated functions NAMES')
+    arg_parser.add_argument(
+        '--memo-size', type=int, default=MEMO_SIZE, metavar='N',
+        help=f'results kept per memoized function (default: {MEMO_SIZE})')
+    arg_parser.add_argument(
+        '--tier', action='store_true',
+        help='compile hot routines and loops to closures while running, '
+             'and report them (tree engine only)')
+    arg_parser.add_argument(
+        '--tier-threshold', type=int, default=TIER_THRESHOLD, metavar='N',
+        help='calls of a routine or iterations of a loop before it is '
+             f'compiled (default: {TIER_THRESHOLD})')
+    arg_parser.add_argument(
+        '--profile', action='store_true',
+        help='print the time spent per routine and the most executed '
+             'lines to stderr at exit (tree engine only)')
+    arg_parser.add_argument(
+        '--profile-json', metavar='FILE',
+        help='like --profile, also write the whole profile to FILE as JSON')
+    arg_parser.add_argument(
+        '--sample', metavar='FILE',
+        help='sample the Pascal call stack while running and write the '
+             'collapsed stacks, for flame graph tools, to FILE '
+             '(tree engine only)')
+    arg_parser.add_argument(
+        '--sample-interval', type=float, default=SAMPLE_INTERVAL * 1000,
+        metavar='MS',
+        help='milliseconds between two samples '
+             f'(default: {SAMPLE_INTERVAL * 1000:g})')
+    arg_parser.add_argument(
+        '--stats', action='store_true',
+        help='print the time, CPU time, peak traced memory and counts of '
+             'every phase of the run to stderr at exit')
+    arg_parser.add_argument(
+        '--stats-memory', action='store_true',
+        help='like --stats, also tracing memory while the program runs; '
+             'slow, very slow for deep recursion')
+    arg_parser.add_argument(
+        '--input', metavar='FILE',
+        help='read the input of READLN from FILE instead of stdin')
+    arg_parser.add_argument(
+        '--mmap', action='store_true',
+        help='memory-map the --input file instead of reading it')
+    arg_parser.add_argument(
+        '--input-block-size', type=int, default=BLOCK_SIZE, metavar='N',
+        help=f'bytes of input read at a time (default: {BLOCK_SIZE})')
+    arg_parser.add_argument(
+        '--output', metavar='FILE',
+        help='write the output of WRITELN to FILE instead of stdout')
+    arg_parser.add_argument(
+        '--flush', choices=FLUSH_POLICIES, default='size',
+        help='when buffered output is written out: when the buffer is '
+             'full, after every WRITELN, or at exit; it is always written '
+             'before READLN (default: size)')
+    arg_parser.add_argument(
+        '--buffer-size', type=int, default=BUFFER_SIZE, metavar='N',
+        help=f'output buffer size in characters (default: {BUFFER_SIZE})')
+    arg_parser.add_argument(
+        '--stream', action='store_true',
+        help='read the source in chunks instead of loading it whole')
+    arg_parser.add_argument(
+        '--cache-dir',
+        help='compiled program cache directory '
+             '(default: __pascache__ next to the source file)')
+    arg_parser.add_argument(
+        '--no-cache', action='store_true',
+        help='always compile the source, never read or write the cache')
+    args = arg_parser.parse_args()
+    if args.stream and not hasattr(LEXERS[args.lexer], 'from_file'):
+        arg_parser.error(f'--stream is not supported by the {args.lexer} lexer')
+
+    if args.mmap and not args.input:
+        arg_parser.error('--mmap needs an --input file')
+    memoize = None
+    if args.memoize:
+        memoize = True
+    elif args.memoize_only:
+        memoize = set(args.memoize_only.split(','))
+    if memoize and args.engine != 'tree':
+        arg_parser.error('--memoize is only supported by the tree engine')
+    if args.tier and args.engine != 'tree':
+        arg_parser.error('--tier is only supported by the tree engine')
+    if args.tier and memoize:
+        # compiled code calls functions without their memo tables
+        arg_parser.error('--tier can not be combined with --memoize')
+    args.stats = args.stats or args.stats_memory
+    profile = args.profile or args.profile_json
+    if profile and args.engine != 'tree':
+        arg_parser.error('--profile is only supported by the tree engine')
+    if profile and args.tier:
+        # compiled code is invisible to the profiler
+        arg_parser.error('--profile can not be combined with --tier')
+    if args.sample and args.engine != 'tree':
+        arg_parser.error('--sample is only supported by the tree engine')
 
     logging.basicConfig(filename='log.log', filemode='w', level=logging.DEBUG)
 
-    interpreter = Interpreter()
-    result = interpreter.interpret()
+    cache = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir or os.path.join(
+            os.path.dirname(os.path.abspath(args.inputfile)), '__pascache__')
+        cache = ProgramCache(cache_dir)
+
+    sink = FileSink(args.output) if args.output else StdoutSink()
+    output = Output(sink, args.flush, args.buffer_size)
+    if args.input:
+        reader = Input.from_file(
+            args.input, args.input_block_size, use_mmap=args.mmap)
+    else:
+        reader = Input(read_blocks(sys.stdin.buffer, args.input_block_size))
+
+    options = {}
+    interpreter_class = Interpreter
+    if args.tier:
+        interpreter_class = TieredInterpreter
+        options['tier_threshold'] = args.tier_threshold
+    elif profile:
+        interpreter_class = ProfilingInterpreter
+    elif args.sample:
+        interpreter_class = SampledInterpreter
+    elif args.stats and args.engine == 'tree':
+        interpreter_class = MeteredInterpreter
+    metrics = None
+    if args.stats:
+        metrics = Metrics(trace_execution=args.stats_memory)
+    try:
+        interpreter = interpreter_class(
+            lexer_class=LEXERS[args.lexer],
+            path=args.inputfile,
+            stream=args.stream,
+            cache=cache,
+            optimize=args.optimize,
+            memoize=memoize,
+            memo_size=args.memo_size,
+            output=output,
+            input=reader,
+            metrics=metrics,
+            **options
+        )
+    except SemanticError as e:
+        print(e)
+        sys.exit(1)
+    if args.emit_python:
+        source, _ = compile_program(interpreter.tree, interpreter.scopes)
+        with open(args.emit_python, 'w') as module:
+            module.write(source)
+
+    if args.disassemble:
+        program = BytecodeCompiler(interpreter.scopes).compile(interpreter.tree)
+        print(disassemble(program))
+        output.close()
+        return
+
+    try:
+        if args.engine == 'python':
+            with interpreter.phase('codegen'):
+                _, code = compile_program(
+                    interpreter.tree, interpreter.scopes)
+            with interpreter.phase('execute'):
+                result = run_deep(run_program, code, output, reader)
+        elif args.engine == 'closure':
+            with interpreter.phase('codegen'):
+                program = ClosureCompiler(
+                    interpreter.scopes, output, reader).compile(
+                    interpreter.tree)
+            with interpreter.phase('execute'):
+                result = run_deep(program)
+        elif args.engine == 'vm':
+            with interpreter.phase('codegen'):
+                program = BytecodeCompiler(interpreter.scopes).compile(
+                    interpreter.tree)
+            # the VM keeps its own call stack, any depth is fine
+            with interpreter.phase('execute'):
+                result = VM(program, output, reader).run()
+        elif args.sample:
+            sampler = SamplingProfiler(
+                interpreter, args.sample_interval / 1000)
+            try:
+                result = run_deep(sampler.run, interpreter.interpret)
+            finally:
+                sampler.write(args.sample)
+        else:
+            result = run_deep(interpreter.interpret)
+    finally:
+        output.close()
     print(result)
+    for table in interpreter.memo_tables.values():
+        print(table, file=sys.stderr)
+    for promotion in getattr(interpreter, 'promotions', ()):
+        print(promotion, file=sys.stderr)
+    if profile:
+        print(interpreter.report(), file=sys.stderr)
+        if args.profile_json:
+            interpreter.write_json(args.profile_json)
+    if metrics is not None:
+        metrics.close()
+        print(metrics.report(), file=sys.stderr)
 
 
 if __name__ == '__main__':
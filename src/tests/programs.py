@@ -0,0 +1,25 @@
+"""Programs and helpers shared by the tests."""
+import glob
+import os
+from Interpreter.input import Input
+from Interpreter.interpreter import Interpreter
+from Interpreter.output import MemorySink, Output
+from Interpreter.recursion import run_deep
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(SRC, 'benchmarks', 'corpus', '*.pas')))
+PROGRAMS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs')
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def interpret(text, stdin='', **options):
+    """Return the output of `text` run by the tree interpreter."""
+    sink = MemorySink()
+    interpreter = Interpreter(text, output=Output(sink),
+                              input=Input((stdin.encode(),)), **options)
+    run_deep(interpreter.interpret)
+    return sink.getvalue()
@@ -0,0 +1,28 @@
+PROGRAM Consts;
+VAR
+   i, x, t : INTEGER;
+   r : REAL;
+   s : STRING;
+BEGIN
+   x := 3;
+   t := 0;
+   r := 0.0;
+   s := 'a' + 'b';
+   FOR i := 1 TO 2 * 1000 DO
+   BEGIN
+      t := t + (2 + 3) * 4 - -1 + x * 1 + 0;
+      r := r + 10 / 4 + 0;
+      IF 1 < 2 THEN
+         t := t + 1
+      ELSE
+         t := t - 1000;;
+      IF 3 = 4 THEN
+         t := t * 0;;
+      WHILE 2 > 5 DO
+         t := 0;;
+      x := 1 * x - 0;
+      ;
+   END;;
+   WRITELN(t, r, s, 7 DIV 2, 7 / 2, -(3 - 5), +(2), 0 + x);
+   WRITELN(x * 1.0, x + 0.0)
+END.
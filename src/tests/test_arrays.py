@@ -0,0 +1,45 @@
+import pytest
+from array import array
+from Interpreter import arrays
+from Lexer.token_types import *
+
+MAX = 2 ** 63 - 1
+MIN = -2 ** 63
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        if arrays.numpy is None:
+            pytest.skip('NumPy is not installed')
+    else:
+        monkeypatch.setattr(arrays, 'numpy', None)
+    return request.param
+
+
+@pytest.mark.parametrize('op, left, right', [
+    (PLUS, [MAX, 1], 1),
+    (MINUS, [0, MIN], 1),
+    (MUL, [3, MAX // 2], 3),
+    (INTEGER_DIV, [MIN, 4], -1),
+    (PLUS, 1, [1, MAX]),
+    (MUL, [2, MIN], [1, 2]),
+])
+def test_integer_overflow_raises(backend, op, left, right):
+    if isinstance(left, list):
+        left = array('q', left)
+    if isinstance(right, list):
+        right = array('q', right)
+    with pytest.raises(OverflowError):
+        arrays.elementwise(op, left, right)
+
+
+@pytest.mark.parametrize('op, left, right, expected', [
+    (PLUS, [MAX - 1, MIN + 2, 1], 1, [MAX, MIN + 3, 2]),
+    (MINUS, [MAX - 1, MIN + 2, 1], 1, [MAX - 2, MIN + 1, 0]),
+    (MUL, [MAX // 2, MIN // 2, 2], 2, [MAX - 1, MIN, 4]),
+    (INTEGER_DIV, [MIN, MAX, 5], 1, [MIN, MAX, 5]),
+])
+def test_integer_limits_are_exact(backend, op, left, right, expected):
+    result = arrays.elementwise(op, array('q', left), right)
+    assert list(result) == expected
@@ -0,0 +1,80 @@
+import pytest
+from Interpreter.bytecode import BytecodeCompiler, BytecodeProgram, disassemble
+from Interpreter.input import Input
+from Interpreter.interpreter import Interpreter
+from Interpreter.output import MemorySink, Output
+from Interpreter.vm import VM
+from tests.programs import CORPUS, interpret, read
+
+
+@pytest.mark.parametrize('path', CORPUS)
+def test_round_trip_matches_tree_interpreter(path):
+    text = read(path)
+    compiler = Interpreter(text)
+    program = BytecodeCompiler(compiler.scopes).compile(compiler.tree)
+    loaded = BytecodeProgram.loads(program.dumps())
+    assert loaded.code == program.code
+    assert loaded.constants == program.constants
+
+    sink = MemorySink()
+    VM(loaded, Output(sink), Input(())).run()
+    assert sink.getvalue() == interpret(text)
+
+
+SUPERINSTRUCTIONS = '''PROGRAM Super;
+VAR
+   i, j, n : INTEGER;
+   x : REAL;
+   s : STRING;
+PROCEDURE Outer;
+BEGIN
+   { a counter of the enclosing scope is not fused }
+   FOR i := 1 TO 3 DO
+      n := n + i
+END;
+BEGIN
+   n := 0;
+   FOR i := 1 TO 4 DO
+      FOR j := i TO 4 DO
+         n := n + i * j;
+   WRITELN(n);
+   WRITELN(i);
+   FOR j := 5 TO 1 DO
+      n := 0;
+   WRITELN(j);
+   WRITELN(n);
+   Outer();
+   WRITELN(i);
+   WRITELN(n);
+   x := 0.0;
+   s := '';
+   i := 10;
+   WHILE i > 0 DO
+   BEGIN
+      x := x + i / 4;
+      s := s + 'a';
+      IF i = 5 THEN
+         s := s + '|';
+      IF i < n - 40 THEN
+         s := s + '<';
+      i := i - 1
+   END;;
+   WRITELN(x);
+   WRITELN(s);
+   IF i * 2 = 0 THEN
+      WRITELN('zero')
+END.
+'''
+
+
+def test_superinstructions_match_tree_interpreter():
+    compiler = Interpreter(SUPERINSTRUCTIONS)
+    program = BytecodeCompiler(compiler.scopes).compile(compiler.tree)
+    opcodes = set(disassemble(program).split())
+    for name in ('FOR_PREP', 'FOR_NEXT', 'BINARY_LOCAL2',
+                 'BINARY_LOCAL_CONST', 'JUMP_IF_NOT_EQUAL'):
+        assert name in opcodes
+    loaded = BytecodeProgram.loads(program.dumps())
+    sink = MemorySink()
+    VM(loaded, Output(sink), Input(())).run()
+    assert sink.getvalue() == interpret(SUPERINSTRUCTIONS)
@@ -0,0 +1,45 @@
+import gc
+import pytest
+from Interpreter.input import Input
+
+
+def read_all(reader):
+    lines = []
+    while True:
+        try:
+            lines.append(reader.readln())
+        except EOFError:
+            return lines
+
+
+@pytest.mark.filterwarnings('error')
+def test_from_file_closes_the_file(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('1\r\n2\n3')
+    for use_mmap in (False, True):
+        reader = Input.from_file(str(path), block_size=2, use_mmap=use_mmap)
+        assert read_all(reader) == ['1', '2', '3']
+        # an open file would warn when collected
+        del reader
+        gc.collect()
+
+
+LINE_ENDINGS = [
+    'a\nb\nc',
+    'a\r\nb\r\nc\r\n',
+    'a\rb\rc\r',
+    'a\r\n\r\nb\r\r\nc\n\r',
+    '\r',
+    '\n\n',
+    'text\r',
+    'x\r\r',
+    '',
+]
+
+
+@pytest.mark.parametrize('text', LINE_ENDINGS)
+@pytest.mark.parametrize('block_size', [1, 2, 3, 64])
+def test_lines_end_like_splitlines(text, block_size):
+    data = text.encode()
+    blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)]
+    assert read_all(Input(blocks)) == text.splitlines()
@@ -0,0 +1,23 @@
+from tests.programs import interpret
+
+MIXED_ARGUMENTS = '''PROGRAM Mixed;
+VAR
+   x : REAL;
+FUNCTION Twice(v : REAL) : REAL;
+BEGIN
+   Twice := v * 2
+END;
+BEGIN
+   x := 1.0;
+   WRITELN(Twice(1));
+   WRITELN(Twice(x));
+   WRITELN(Twice(1.0))
+END.
+'''
+
+
+def test_equal_arguments_of_other_types_are_kept_apart():
+    expected = interpret(MIXED_ARGUMENTS)
+    assert expected == '2\n2.0\n2.0\n'
+    assert interpret(MIXED_ARGUMENTS, memoize=True) == expected
+    assert interpret(MIXED_ARGUMENTS, memoize={'Twice'}) == expected
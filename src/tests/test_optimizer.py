@@ -0,0 +1,75 @@
+import os
+import pytest
+from Interpreter.interpreter import Interpreter
+from Parser.ast import BinOp, For, Num, Var
+from tests.programs import PROGRAMS, interpret, read
+
+REAL_IDENTITIES = '''PROGRAM Identities;
+VAR
+   x : INTEGER;
+BEGIN
+   x := 3;
+   WRITELN(x * 1.0);
+   WRITELN(x + 0.0);
+   WRITELN(1.0 * x);
+   WRITELN(0.0 + x)
+END.
+'''
+
+
+def test_levels_agree():
+    text = read(os.path.join(PROGRAMS, 'consts.pas'))
+    expected = interpret(text, optimize=0)
+    assert interpret(text, optimize=1) == expected
+    assert interpret(text, optimize=2) == expected
+
+
+def test_folds_constants_and_dead_branches():
+    text = read(os.path.join(PROGRAMS, 'consts.pas'))
+    children = Interpreter(text, optimize=1).tree.block.compound_statement \
+        .children
+    assert children[3].right.value == 'ab'
+    loop = next(child for child in children if isinstance(child, For))
+    # t := ..., r := ..., t := t + 1, x := ...: the IF with a false
+    # condition, the WHILE that never runs and the empty statement are gone
+    statements = loop.statement.children
+    assert len(statements) == 4
+    # r + 10 / 4 + 0 is (r + 10 / 4) + 0, level 1 folds 10 / 4 only
+    folded = statements[1].right.left.right
+    assert isinstance(folded, Num) and folded.value == 2.5
+
+
+def test_real_identities_are_kept():
+    tree = Interpreter(REAL_IDENTITIES, optimize=2).tree
+    writes = tree.block.compound_statement.children[1:]
+    for write in writes:
+        operation = write.params[0]
+        assert isinstance(operation, BinOp)
+        assert any(isinstance(operand, Num) and type(operand.value) is float
+                   for operand in (operation.left, operation.right))
+    assert interpret(REAL_IDENTITIES, optimize=2) == '3.0\n3.0\n3.0\n3.0\n'
+
+
+STRING_IDENTITIES = [
+    "WRITELN('ab' + 0)",
+    "WRITELN(0 + 'ab')",
+    "WRITELN('ab' - 0)",
+    "WRITELN(s + 0)",
+]
+
+
+@pytest.mark.parametrize('statement', STRING_IDENTITIES)
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_string_identities_still_fail(statement, level):
+    text = ("PROGRAM Strings;\nVAR\n   s : STRING;\nBEGIN\n   s := 'ab';\n"
+            f"   {statement}\nEND.\n")
+    with pytest.raises(TypeError):
+        interpret(text, optimize=level)
+
+
+def test_integer_identities_are_removed():
+    text = ('PROGRAM Identities;\nVAR\n   x : INTEGER;\nBEGIN\n   x := 3;\n'
+            '   WRITELN(x * 1 + 0)\nEND.\n')
+    tree = Interpreter(text, optimize=2).tree
+    assert isinstance(
+        tree.block.compound_statement.children[1].params[0], Var)
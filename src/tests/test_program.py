@@ -0,0 +1,47 @@
+import sys
+import threading
+import pytest
+from Interpreter.program import CompiledProgram
+from Semantic.semantic import SemanticError
+
+
+@pytest.mark.parametrize('engine', ['tree', 'vm'])
+def test_semantic_error_is_raised_not_exited(engine):
+    with pytest.raises(SemanticError) as error:
+        CompiledProgram.compile('PROGRAM X; BEGIN y := 1 END.', engine=engine)
+    assert str(error.value) == "Error: Symbol(identifier) not found 'y'"
+
+
+DEEP = '''PROGRAM Deep;
+VAR
+   n, r : INTEGER;
+FUNCTION Sum(k : INTEGER) : INTEGER;
+BEGIN
+   IF k = 0 THEN
+      Sum := 0
+   ELSE
+      Sum := k + Sum(k - 1)
+END;
+BEGIN
+   r := Sum(n);
+   WRITELN(r)
+END.
+'''
+
+
+def test_concurrent_runs_share_the_recursion_limit():
+    program = CompiledProgram.compile(DEEP)
+    limit = sys.getrecursionlimit()
+    depths = [2000 + 250 * i for i in range(16)]
+    outputs = [None] * len(depths)
+
+    def run(i):
+        outputs[i] = program.run(bindings={'n': depths[i]}).getvalue()
+    threads = [threading.Thread(target=run, args=(i,))
+               for i in range(len(depths))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outputs == [f'{n * (n + 1) // 2}\n' for n in depths]
+    assert sys.getrecursionlimit() == limit
@@ -0,0 +1,146 @@
+import sys
+from types import SimpleNamespace
+from Interpreter.output import MemorySink, Output
+from Interpreter.recursion import run_deep
+from Interpreter.sampler import SampledInterpreter, SamplingProfiler
+
+RECURSIVE = '''PROGRAM Recursive;
+VAR
+   r : INTEGER;
+FUNCTION Fib(n : INTEGER) : INTEGER;
+BEGIN
+   IF n < 2 THEN
+      Fib := n
+   ELSE
+      Fib := Fib(n - 1) + Fib(n - 2)
+END;
+FUNCTION Sum(n : INTEGER) : INTEGER;
+BEGIN
+   IF n = 0 THEN
+      Sum := Fib(5)
+   ELSE
+      Sum := n + Sum(n - 1)
+END;
+BEGIN
+   r := Sum(30);
+   WRITELN(r);
+   r := Fib(8);
+   WRITELN(r)
+END.
+'''
+
+
+class CheckedInterpreter(SampledInterpreter):
+    """Takes a sample before every assignment and checks it against the
+    whole call stack."""
+
+    def visit_Assign(self, node):
+        result = super().visit_Assign(node)
+        expected = [f'{self.tree.name}:{self.call_stack[0].line}']
+        expected.extend(f'{frame.scope.scope_name}:{frame.line}'
+                        for frame in self.call_stack[1:])
+        self.checked.append(self.profiler.snapshot() == tuple(expected))
+        return result
+
+
+def test_snapshot_reuses_only_unchanged_frames():
+    interpreter = CheckedInterpreter(RECURSIVE, output=Output(MemorySink()))
+    interpreter.profiler = SamplingProfiler(interpreter)
+    interpreter.checked = []
+    run_deep(interpreter.interpret)
+    assert len(interpreter.checked) > 100
+    assert all(interpreter.checked)
+
+
+class ReturningStack(list):
+    """Call stack that runs `on_read` the next time it is sliced, as the
+    interpreter thread can while the profiler reads it."""
+
+    on_read = None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and self.on_read is not None:
+            on_read, self.on_read = self.on_read, None
+            on_read()
+        return super().__getitem__(index)
+
+
+def frame(name, line):
+    return SimpleNamespace(scope=SimpleNamespace(scope_name=name), line=line)
+
+
+def test_return_during_snapshot_is_not_lost():
+    interpreter = SampledInterpreter(RECURSIVE, output=Output(MemorySink()))
+    profiler = SamplingProfiler(interpreter)
+    stack = interpreter.call_stack = ReturningStack(
+        [frame('Recursive', 27), frame('Sum', 20), frame('Sum', 20),
+         frame('Fib', 13)])
+    assert profiler.snapshot() == (
+        'Recursive:27', 'Sum:20', 'Sum:20', 'Fib:13')
+
+    def returned_and_called():
+        # Sum returns into Sum, which calls Fib, which calls Fib
+        del stack[2:]
+        interpreter.low_water = 2
+        stack.extend([frame('Fib', 13), frame('Fib', 13)])
+    stack[1].line = 18
+    stack.on_read = returned_and_called
+    profiler.snapshot()
+    assert profiler.snapshot() == (
+        'Recursive:27', 'Sum:18', 'Fib:13', 'Fib:13')
+
+
+def test_samples_are_collapsed_stacks():
+    interpreter = SampledInterpreter(RECURSIVE, output=Output(MemorySink()))
+    profiler = SamplingProfiler(interpreter, interval=0.0001)
+    run_deep(profiler.run, interpreter.interpret)
+    for line in profiler.folded().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+        parts = stack.split(';')
+        assert parts[0].startswith('Recursive:')
+        assert all(part.split(':')[0] in ('Fib', 'Sum') for part in parts[1:])
+
+
+ALTERNATING = '''PROGRAM Alternating;
+VAR
+   i, r : INTEGER;
+PROCEDURE Leaf;
+BEGIN
+   r := r + 1
+END;
+FUNCTION Down(n : INTEGER) : INTEGER;
+BEGIN
+   IF n = 0 THEN
+      Leaf()
+   ELSE
+      r := Down(n - 1);
+   Leaf();
+   Down := n
+END;
+BEGIN
+   r := 0;
+   FOR i := 1 TO 3000 DO
+      r := Down(i - i DIV 8 * 8)
+END.
+'''
+
+
+def test_threaded_samples_are_stacks_that_existed():
+    # Leaf never calls anything, so a stack with Leaf below its top was
+    # put together from frames of different moments
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        interpreter = SampledInterpreter(
+            ALTERNATING, output=Output(MemorySink()))
+        profiler = SamplingProfiler(interpreter, interval=0)
+        run_deep(profiler.run, interpreter.interpret)
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert sum(profiler.samples.values()) > 100
+    for stack in profiler.samples:
+        names = [part.split(':')[0] for part in stack]
+        assert 'Leaf' not in names[:-1], stack
+        assert names[0] == 'Alternating'
+        assert set(names[1:-1]) <= {'Down'}